@@ -2,12 +2,103 @@
 from __future__ import annotations
 
 import importlib
+import pkgutil
+
+# entry point group for plugins, with entries either
+#   <implementation> = package.module
+#       a module with <implementation>_<filter> functions, like the built-in *_filters modules, or
+#   <implementation>.<filter> = package.module:function
+#       a single filter function
+ENTRY_POINT_GROUP = "in3110_instapy.filters"
+
+# filters registered with register_filter, by (filter, implementation)
+# values are functions, or 'module:function' strings imported on first use
+_registry = {}
+# implementation modules registered by plugins, by implementation name
+_implementation_modules = {}
+_entry_points_loaded = False
+
+
+def register_filter(filter: str, implementation: str, function) -> None:
+    """Register a filter function for get_filter
+
+    Args:
+
+        filter (str):
+            The name of the filter (e.g. 'color2gray')
+        implementation (str):
+            The name of the implementation
+        function (function or str):
+            The filter function, or its import path as 'package.module:function',
+            in which case the module is only imported when the filter is used
+    """
+    _registry[(filter, implementation)] = function
+
+
+def register_implementation(implementation: str, module: str) -> None:
+    """Register a module with <implementation>_<filter> functions, imported on first use
+
+    Args:
+
+        implementation (str):
+            The name of the implementation
+        module (str):
+            The name of the module, e.g. 'my_plugin.filters'
+    """
+    _implementation_modules[implementation] = module
+
+
+def _load_entry_points() -> None:
+    """Register the filters and implementations of installed plugins, once"""
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+
+    from importlib.metadata import entry_points
+
+    try:
+        plugins = entry_points(group=ENTRY_POINT_GROUP)
+    except TypeError:
+        # python < 3.10
+        plugins = entry_points().get(ENTRY_POINT_GROUP, [])
+    for entry_point in plugins:
+        if "." in entry_point.name:
+            implementation, filter = entry_point.name.split(".", 1)
+            _registry.setdefault((filter, implementation), entry_point.value)
+        else:
+            _implementation_modules.setdefault(entry_point.name, entry_point.value)
+
+
+def _import_object(path: str):
+    """Import 'package.module:attribute'"""
+    module_name, _, attribute = path.partition(":")
+    return getattr(importlib.import_module(module_name), attribute)
+
+
+def available_implementations() -> list:
+    """List the implementation names, without importing them
+
+    Returns:
+        list of str: built-in implementations (the *_filters modules)
+        followed by implementations registered by plugins
+    """
+    _load_entry_points()
+    implementations = [
+        module.name[: -len("_filters")] for module in pkgutil.iter_modules(__path__) if module.name.endswith("_filters")
+    ]
+    for implementation in list(_implementation_modules) + [implementation for _, implementation in _registry]:
+        if implementation not in implementations:
+            implementations.append(implementation)
+    return implementations
 
 
 def get_filter(filter: str = "color2gray", implementation: str = "python"):
     """Return the filter function by name
 
-    Assumes filters are named e.g.in3110_instapy.python_filters.python_color2gray.
+    Filters registered with register_filter, or by a plugin's entry point, are used first.
+    Otherwise, assumes filters are named e.g.in3110_instapy.python_filters.python_color2gray.
+    Implementation modules are only imported when one of their filters is requested.
 
     Args:
 
@@ -23,10 +114,50 @@ def get_filter(filter: str = "color2gray", implementation: str = "python"):
             and return the filtered image
             (numpy array of same shape and type as input)
     """
+    _load_entry_points()
+    function = _registry.get((filter, implementation))
+    if isinstance(function, str):
+        # resolve lazy registrations once
+        function = _registry[(filter, implementation)] = _import_object(function)
+    if function is not None:
+        return function
 
     # get the module (instapy.python_filters)
-    module = importlib.import_module(f"in3110_instapy.{implementation}_filters")
+    module_name = _implementation_modules.get(implementation, f"in3110_instapy.{implementation}_filters")
+    module = importlib.import_module(module_name)
     # construct filter function name (python_color2gray)
     filter_name = f"{implementation}_{filter}"
     # return the resolved function (instapy.python.python_color2gray)
     return getattr(module, filter_name)
+
+
+def _output_array(out, shape: tuple, dtype=None):
+    """Return the output array for a filter
+
+    Allocates a new array if out is None,
+    otherwise checks that the caller-provided out has the right shape and type.
+    out can also be a dict, which keeps one array per shape and type:
+    passing the same dict as e.g. `scratch` to every call reuses the work arrays,
+    without knowing their shapes.
+
+    Args:
+        out (np.array, dict or None): caller-provided output buffer
+        shape (tuple): the shape of the filtered image
+        dtype: the type of the filtered image (default: uint8)
+    Returns:
+        np.array: out, or a new array
+    """
+    import numpy as np
+
+    if dtype is None:
+        dtype = np.uint8
+    if isinstance(out, dict):
+        key = (tuple(shape), np.dtype(dtype))
+        if key not in out:
+            out[key] = np.empty(shape, dtype=dtype)
+        return out[key]
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if out.shape != tuple(shape) or out.dtype != dtype:
+        raise ValueError(f"out must have shape {tuple(shape)} and dtype {np.dtype(dtype)}, got {out.shape} {out.dtype}")
+    return out
@@ -0,0 +1,163 @@
+"""automatic implementation: dispatch each call to the fastest backend for its size
+
+Which implementation is fastest depends on the image size and the machine.
+The first time it is used, `auto` times the available implementations
+on a few image sizes (a short calibration), and stores the size ranges
+where each implementation wins in a cache file, so the calibration
+only runs once per machine.
+Each call is then sent to the fastest implementation for its number of pixels.
+
+The cache file is `$INSTAPY_CACHE_DIR/auto.json`
+(default: `~/.cache/in3110_instapy/auto.json`).
+"""
+from __future__ import annotations
+
+import json
+import math
+import os
+import platform
+from pathlib import Path
+
+import numpy as np
+
+from . import get_filter, io
+from .cache import cache_dir
+
+CANDIDATES = ["numpy", "numpy_int", "lut", "numpy_tiled", "numba_parallel", "numba", "cython"]
+FILTERS = ["color2gray", "color2sepia"]
+# (width, height) of the calibration images
+CALIBRATION_SIZES = [(64, 48), (320, 240), (1280, 960)]
+# bump when the cache format or the candidates change, to recalibrate
+CACHE_VERSION = 1
+
+# the crossovers used by this process, loaded or calibrated on first use
+_crossovers = None
+
+
+def cache_file() -> Path:
+    """The file the calibration is stored in"""
+    return cache_dir() / "auto.json"
+
+
+def _machine() -> dict:
+    """What the calibration depends on, to recalibrate e.g. on another machine"""
+    return {"version": CACHE_VERSION, "node": platform.node(), "machine": platform.machine(), "cpus": os.cpu_count()}
+
+
+def _crossover_points(winners: list) -> list:
+    """Turn the fastest implementation per calibration size into size ranges
+
+    Args:
+        winners (list): (pixels, implementation) for each calibration size
+    Returns:
+        list: [below, implementation] pairs, sorted by `below`:
+        the implementation to use for images with fewer than `below` pixels.
+        The last `below` is None (any size).
+    """
+    winners = sorted(winners)
+    crossovers = []
+    for (pixels, implementation), (next_pixels, next_implementation) in zip(winners, winners[1:]):
+        if implementation != next_implementation:
+            # switch halfway between the sizes, on a log scale
+            crossovers.append([int(math.sqrt(pixels * next_pixels)), implementation])
+    crossovers.append([None, winners[-1][1]])
+    return crossovers
+
+
+def calibrate(sizes: list | None = None, implementations: list | None = None, save: bool = True) -> dict:
+    """Time the implementations, and find the fastest for each size range
+
+    Args:
+        sizes (list): calibration image sizes, as (width, height) (default: CALIBRATION_SIZES)
+        implementations (list): the candidate implementations (default: CANDIDATES),
+            those that can't be loaded (e.g. cython when not built) are left out
+        save (bool): store the result in the cache file
+    Returns:
+        dict: the crossover points (see _crossover_points) for each filter
+    """
+    from .benchmark import measure
+
+    if sizes is None:
+        sizes = CALIBRATION_SIZES
+    if implementations is None:
+        implementations = CANDIDATES
+
+    crossovers = {}
+    for filter_name in FILTERS:
+        filter_functions = {}
+        for implementation in implementations:
+            try:
+                filter_functions[implementation] = get_filter(filter_name, implementation)
+            except (ImportError, AttributeError):
+                continue
+        if not filter_functions:
+            raise ValueError(f"None of the implementations {implementations} are available")
+
+        winners = []
+        for width, height in sizes:
+            image = io.random_image(width, height)
+            times = {
+                implementation: np.median(measure(filter_function, image, warmup=1, repeat=3))
+                for implementation, filter_function in filter_functions.items()
+            }
+            winners.append((width * height, min(times, key=times.get)))
+        crossovers[filter_name] = _crossover_points(winners)
+
+    if save:
+        path = cache_file()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({**_machine(), "crossovers": crossovers}, f, indent=2)
+    return crossovers
+
+
+def get_crossovers() -> dict:
+    """The crossover points for this machine, from the cache file or a new calibration"""
+    global _crossovers
+    if _crossovers is None:
+        try:
+            with open(cache_file()) as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            cached = {}
+        if {key: cached.get(key) for key in _machine()} == _machine():
+            _crossovers = cached["crossovers"]
+        else:
+            _crossovers = calibrate()
+    return _crossovers
+
+
+def choose_implementation(filter: str, shape: tuple) -> str:
+    """The fastest implementation of a filter for an image shape"""
+    pixels = shape[0] * shape[1]
+    for below, implementation in get_crossovers()[filter]:
+        if below is None or pixels < below:
+            return implementation
+
+
+def auto_color2gray(image: np.array, out: np.array = None) -> np.array:
+    """Convert rgb pixel array to grayscale, with the fastest implementation for its size
+
+    Args:
+        image (np.array)
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: gray_image
+    """
+    image = np.asarray(image)
+    implementation = choose_implementation("color2gray", image.shape)
+    return get_filter("color2gray", implementation)(image, out=out)
+
+
+def auto_color2sepia(image: np.array, out: np.array = None) -> np.array:
+    """Convert rgb pixel array to sepia, with the fastest implementation for its size
+
+    Args:
+        image (np.array)
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: sepia_image
+    """
+    image = np.asarray(image)
+    implementation = choose_implementation("color2sepia", image.shape)
+    return get_filter("color2sepia", implementation)(image, out=out)
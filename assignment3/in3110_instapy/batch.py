@@ -0,0 +1,199 @@
+"""Batch mode: filter every image in a directory with a pool of processes
+
+Each worker process gets a chunk of files at a time. It decodes and filters
+them one by one, and hands the filtered images to its own pool of encoder
+threads, so the next file is decoded and filtered while the previous ones
+are encoded (PIL's encoders release the GIL).
+"""
+from __future__ import annotations
+
+import itertools
+import os
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from PIL import Image
+
+from . import get_filter, io
+from .cli import run_filter
+
+
+def find_images(in_dir: str) -> list:
+    """List the image files in a directory
+
+    Args:
+        in_dir (str): the directory to search
+    Returns:
+        list of Path: the files with an extension known to PIL, sorted by name
+    """
+    extensions = Image.registered_extensions()
+    return sorted(path for path in Path(in_dir).iterdir() if path.is_file() and path.suffix.lower() in extensions)
+
+
+def pool_context():
+    """The multiprocessing context to start worker pools with
+
+    Workers are not forked: a forked child can deadlock on the thread pools
+    of numba, OpenMP, etc. in the parent.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+# the encoder threads of a worker process, started by _warm_up
+_encoder = None
+
+
+def _warm_up(implementation: str, filter: str, encode_threads: int = 2) -> None:
+    """Pool initializer: run the filter once, so e.g. numba compiles before the first file,
+    and start the encoder threads"""
+    global _encoder
+    get_filter(filter, implementation)(io.random_image(8, 8))
+    _encoder = ThreadPoolExecutor(max_workers=encode_threads)
+
+
+def _filter_chunk(tasks: list) -> list:
+    """Decode and filter a chunk of files in a worker process, encoding them on its encoder threads
+
+    Returns:
+        list of (path, bytes read, error message or None, whether the result was cached, stage timings)
+    """
+    pending = []
+    for path, out_file, implementation, filter, scale, cache, cache_size, encode in tasks:
+        timings = {}
+        try:
+            future = run_filter(
+                path,
+                out_file=out_file,
+                implementation=implementation,
+                filter=filter,
+                scale=scale,
+                cache=cache,
+                cache_size=cache_size,
+                timings=timings,
+                encode=encode,
+                encoder=_encoder,
+            )
+        except Exception as e:
+            pending.append((path, None, f"{type(e).__name__}: {e}", timings))
+        else:
+            pending.append((path, future, None, timings))
+
+    results = []
+    for path, future, error, timings in pending:
+        if future is not None:
+            try:
+                future.result()
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+        if error is None:
+            # run_filter returns no future for cache hits
+            results.append((path, os.path.getsize(path), None, future is None, timings))
+        else:
+            results.append((path, 0, error, False, timings))
+    return results
+
+
+def run_batch(
+    in_dir: str,
+    out_dir: str,
+    implementation: str = "python",
+    filter: str = "color2gray",
+    scale: float = 1,
+    jobs: int | None = None,
+    chunksize: int = 4,
+    cache: bool = False,
+    cache_size: int | None = None,
+    encode: str | None = None,
+    encode_threads: int = 2,
+) -> dict:
+    """Filter every image in `in_dir`, writing results with the same names to `out_dir`
+
+    Files are streamed through a pool of `jobs` processes, in chunks of `chunksize` files.
+    Each process decodes and filters one file at a time,
+    and encodes the results on `encode_threads` threads.
+
+    Args:
+        in_dir (str): directory of input images
+        out_dir (str): directory for the filtered images (created if needed)
+        implementation (str): the filter implementation
+        filter (str): the filter name
+        scale (float): scale factor to resize images
+        jobs (int): number of worker processes (optional, default: one per cpu)
+        chunksize (int): number of files sent to a worker at a time
+        cache (bool): use the result cache (see cli.run_filter)
+        cache_size (int): size limit of the result cache in bytes (optional)
+        encode (str): the encoder preset, see io.ENCODE_PRESETS (optional)
+        encode_threads (int): number of encoder threads per worker process
+    Returns:
+        dict: summary with the number of images, bytes read, elapsed time and failures,
+        the time spent filtering and encoding (summed over the workers and threads),
+        and the cache hits and misses if cache is true
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs < 1:
+        raise ValueError(f"jobs must be positive, got {jobs=}")
+    if chunksize < 1 or encode_threads < 1:
+        raise ValueError(f"chunksize and encode_threads must be positive, got {chunksize=}, {encode_threads=}")
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    tasks = (
+        (str(path), str(out_dir / path.name), implementation, filter, scale, cache, cache_size, encode)
+        for path in find_images(in_dir)
+    )
+    # the pool's own chunking would send the files of a chunk to _filter_chunk one at a time
+    chunks = iter(lambda: list(itertools.islice(tasks, chunksize)), [])
+
+    images = 0
+    nbytes = 0
+    failed = {}
+    hits = 0
+    stages = {"filter": 0.0, "encode": 0.0}
+    start = time.perf_counter()
+    with pool_context().Pool(jobs, initializer=_warm_up, initargs=(implementation, filter, encode_threads)) as pool:
+        for results in pool.imap_unordered(_filter_chunk, chunks):
+            for path, size, error, cached, timings in results:
+                if error is None:
+                    images += 1
+                    nbytes += size
+                    hits += cached
+                else:
+                    failed[path] = error
+                for name in stages:
+                    stages[name] += timings.get(name, 0)
+    elapsed = time.perf_counter() - start
+
+    summary = {
+        "images": images,
+        "bytes": nbytes,
+        "seconds": elapsed,
+        "failed": failed,
+        "filter_seconds": stages["filter"],
+        "encode_seconds": stages["encode"],
+    }
+    if cache:
+        summary["cache_hits"] = hits
+        summary["cache_misses"] = images - hits
+    return summary
+
+
+def print_summary(summary: dict) -> None:
+    """Print the throughput of a batch run"""
+    seconds = summary["seconds"]
+    megabytes = summary["bytes"] / 1e6
+    images_per_second = summary["images"] / seconds if seconds else float("inf")
+    megabytes_per_second = megabytes / seconds if seconds else float("inf")
+    for path, error in summary["failed"].items():
+        print(f"Failed {path}: {error}")
+    print(
+        f"Filtered {summary['images']} images ({megabytes:.1f} MB) in {seconds:.2f}s: "
+        f"{images_per_second:.1f} images/s, {megabytes_per_second:.1f} MB/s"
+    )
+    if "encode_seconds" in summary:
+        print(f"Time spent filtering: {summary['filter_seconds']:.2f}s, encoding: {summary['encode_seconds']:.2f}s")
+    if "cache_hits" in summary:
+        print(f"Cache: {summary['cache_hits']} hits, {summary['cache_misses']} misses")
@@ -0,0 +1,403 @@
+"""Benchmark suite for the filter implementations
+
+Times every combination of image size, filter and implementation.
+Each combination is called a few times first without measuring (warm-up,
+which e.g. includes numba's compilation), then timed call by call with
+`time.perf_counter`, and summarized by the median, interquartile range and minimum.
+
+The peak memory of one call is measured separately (tracing slows down
+the call), both as the peak memory allocated through Python and numpy
+(tracemalloc) and as the growth of the process' resident set size (RSS),
+sampled by a background thread, which also sees memory allocated by
+compiled code (numba, Cython).
+
+Filters with a kernel (blur, box_blur, sharpen) are timed for each kernel radius,
+to show how their cost grows with the kernel size.
+
+Results are written as JSON, and two result files can be compared
+to find speed and memory regressions.
+
+Run as:
+
+    python -m in3110_instapy.benchmark run -o results.json
+    python -m in3110_instapy.benchmark run --filters blur box_blur --radii 1 4 16 -i numpy numba
+    python -m in3110_instapy.benchmark compare baseline.json results.json
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import threading
+import time
+import tracemalloc
+from functools import partial
+from typing import Callable
+
+import numpy as np
+
+from . import available_implementations, get_filter, io
+from .kernels import KERNEL_FILTERS
+
+# (width, height)
+DEFAULT_SIZES = [(320, 180), (1280, 720), (3840, 2160)]
+DEFAULT_FILTERS = ["color2gray", "color2sepia"]
+# kernel radii for the KERNEL_FILTERS
+DEFAULT_RADII = [1, 2, 4, 8, 16]
+# memory growth smaller than this is not a regression (bytes)
+MEMORY_NOISE = 64 * 1024
+# left out by default: the pure Python reference takes minutes at the larger sizes,
+# and auto only dispatches to the others
+EXCLUDED_IMPLEMENTATIONS = ["python", "auto"]
+
+
+def measure(function: Callable, *arguments, warmup: int = 2, repeat: int = 7) -> list:
+    """Time function(*arguments) call by call
+
+    Args:
+        function (callable): the function to time
+        *arguments: arguments to pass to function
+        warmup (int): number of calls before measuring, which are not timed
+        repeat (int): number of timed calls
+    Returns:
+        list of float: the time of each timed call, in seconds
+    """
+    for _ in range(warmup):
+        function(*arguments)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(*arguments)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def _rss() -> int | None:
+    """The current resident set size of this process, in bytes (None if unknown)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        # not Linux
+        return None
+
+
+def measure_memory(function: Callable, *arguments, interval: float = 0.0005) -> dict:
+    """Measure the peak memory of one call to function(*arguments)
+
+    RSS is sampled every `interval` seconds while the function runs.
+    A function holding the GIL (e.g. numba without nogil)
+    is only sampled before and after, when its output is still alive.
+
+    Args:
+        function (callable): the function to measure
+        *arguments: arguments to pass to function
+        interval (float): the RSS sampling interval, in seconds
+    Returns:
+        dict: 'peak_traced', the peak memory allocated during the call, as seen by tracemalloc,
+        and 'peak_rss', the peak growth of the RSS during the call (None if unknown), in bytes
+    """
+    start_rss = _rss()
+    peak_rss = [start_rss]
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(interval):
+            peak_rss[0] = max(peak_rss[0], _rss())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    # python >= 3.9
+    getattr(tracemalloc, "reset_peak", lambda: None)()
+    start_traced = tracemalloc.get_traced_memory()[0]
+    if start_rss is not None:
+        sampler.start()
+    try:
+        result = function(*arguments)
+        peak_traced = tracemalloc.get_traced_memory()[1] - start_traced
+    finally:
+        done.set()
+        if start_rss is not None:
+            sampler.join()
+        if not was_tracing:
+            tracemalloc.stop()
+    if start_rss is not None:
+        # with the result still alive
+        peak_rss[0] = max(peak_rss[0], _rss())
+    del result
+    return {
+        "peak_traced": peak_traced,
+        "peak_rss": None if start_rss is None else peak_rss[0] - start_rss,
+    }
+
+
+def summarize(times: list) -> dict:
+    """Summary statistics of a list of timings, in seconds"""
+    q1, median, q3 = np.percentile(times, [25, 50, 75])
+    return {
+        "median": float(median),
+        "iqr": float(q3 - q1),
+        "min": float(np.min(times)),
+        "mean": float(np.mean(times)),
+        "calls": len(times),
+    }
+
+
+def _metadata() -> dict:
+    """Describe the machine and software the benchmark ran with"""
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def run_suite(
+    sizes: list = DEFAULT_SIZES,
+    filters: list = DEFAULT_FILTERS,
+    implementations: list | None = None,
+    warmup: int = 2,
+    repeat: int = 7,
+    memory: bool = True,
+    verbose: bool = False,
+    radii: list = DEFAULT_RADII,
+) -> dict:
+    """Benchmark every combination of image size, filter and implementation
+
+    Filters in KERNEL_FILTERS are benchmarked for every kernel radius too.
+
+    Args:
+        sizes (list): image sizes, as (width, height)
+        filters (list): filter names
+        implementations (list): implementation names
+            (default: all available, except EXCLUDED_IMPLEMENTATIONS)
+        warmup (int): number of untimed calls before measuring
+        repeat (int): number of timed calls
+        memory (bool): also measure the peak memory of one call
+        verbose (bool): print each result as it is measured
+        radii (list): kernel radii for the KERNEL_FILTERS
+    Returns:
+        dict: with 'metadata', 'results' (one dict per combination)
+        and 'skipped' (implementation -> filter -> why it could not be loaded)
+    """
+    if implementations is None:
+        implementations = [name for name in available_implementations() if name not in EXCLUDED_IMPLEMENTATIONS]
+
+    results = []
+    skipped = {}
+    for width, height in sizes:
+        image = io.random_image(width, height)
+        for filter_name in filters:
+            for implementation in implementations:
+                try:
+                    filter_function = get_filter(filter_name, implementation)
+                except (ImportError, AttributeError) as e:
+                    # e.g. cython, when the package was built without it
+                    # or a filter the implementation doesn't have
+                    skipped.setdefault(implementation, {})[filter_name] = f"{type(e).__name__}: {e}"
+                    continue
+                for radius in radii if filter_name in KERNEL_FILTERS else [None]:
+                    function = filter_function if radius is None else partial(filter_function, radius=radius)
+                    times = measure(function, image, warmup=warmup, repeat=repeat)
+                    result = {
+                        "filter": filter_name,
+                        "implementation": implementation,
+                        "width": width,
+                        "height": height,
+                        **summarize(times),
+                    }
+                    if radius is not None:
+                        result["radius"] = radius
+                    if memory:
+                        result.update(measure_memory(function, image))
+                    results.append(result)
+                    if verbose:
+                        print(format_result(result), flush=True)
+    return {"metadata": _metadata(), "results": results, "skipped": skipped}
+
+
+def write_results(suite: dict, filename: str) -> None:
+    """Write the results of run_suite to a JSON file"""
+    with open(filename, "w") as f:
+        json.dump(suite, f, indent=2)
+        f.write("\n")
+
+
+def read_results(filename: str) -> dict:
+    """Read the results of run_suite from a JSON file"""
+    with open(filename) as f:
+        return json.load(f)
+
+
+def _key(result: dict) -> tuple:
+    return result["filter"], result["implementation"], result["width"], result["height"], result.get("radius")
+
+
+def compare(baseline: dict, current: dict, threshold: float = 0.1, memory_threshold: float = 0.1) -> list:
+    """Compare two benchmark results, flagging regressions
+
+    A combination has regressed if its median time grew by more than `threshold`
+    (a fraction), and by more than the measurement noise (the mean of the two IQRs).
+    Its memory has regressed if the traced peak memory grew by more than
+    `memory_threshold` (a fraction), and by more than MEMORY_NOISE bytes.
+
+    Args:
+        baseline (dict): results of run_suite to compare against
+        current (dict): new results of run_suite
+        threshold (float): allowed relative slowdown of the median
+        memory_threshold (float): allowed relative growth of the peak memory
+    Returns:
+        list of dict: one per combination in both results, with the
+        baseline and current median, their ratio, and whether it regressed,
+        and the same for the peak memory (if measured in both)
+    """
+    baseline_results = {_key(result): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        before = baseline_results.get(_key(result))
+        if before is None:
+            continue
+        ratio = result["median"] / before["median"] if before["median"] else float("inf")
+        noise = (before["iqr"] + result["iqr"]) / 2
+        rows.append(
+            {
+                "filter": result["filter"],
+                "implementation": result["implementation"],
+                "width": result["width"],
+                "height": result["height"],
+                "radius": result.get("radius"),
+                "baseline": before["median"],
+                "current": result["median"],
+                "ratio": ratio,
+                "regression": ratio > 1 + threshold and result["median"] - before["median"] > noise,
+            }
+        )
+        if before.get("peak_traced") is not None and result.get("peak_traced") is not None:
+            growth = result["peak_traced"] - before["peak_traced"]
+            rows[-1].update(
+                {
+                    "baseline_memory": before["peak_traced"],
+                    "current_memory": result["peak_traced"],
+                    "memory_regression": growth > memory_threshold * before["peak_traced"] and growth > MEMORY_NOISE,
+                }
+            )
+    return rows
+
+
+def _filter_label(result: dict) -> str:
+    """The filter name, with the kernel radius if there is one"""
+    if result.get("radius") is None:
+        return result["filter"]
+    return f"{result['filter']} r={result['radius']}"
+
+
+def format_result(result: dict) -> str:
+    """One line describing a benchmark result"""
+    size = f"{result['width']}x{result['height']}"
+    return (
+        f"{result['implementation']:>15} {_filter_label(result):<14} {size:>10}: "
+        f"median {result['median']:.6f}s  IQR {result['iqr']:.6f}s  min {result['min']:.6f}s"
+        f"{_format_memory(result)}"
+    )
+
+
+def _megabytes(nbytes: int | None) -> str:
+    return "?" if nbytes is None else f"{nbytes / 1e6:.1f} MB"
+
+
+def _format_memory(result: dict) -> str:
+    if result.get("peak_traced") is None:
+        return ""
+    return f"  peak {_megabytes(result['peak_traced'])} (RSS +{_megabytes(result.get('peak_rss'))})"
+
+
+def format_comparison(row: dict) -> str:
+    """One line describing the comparison of a benchmark result"""
+    size = f"{row['width']}x{row['height']}"
+    flag = "  REGRESSION" if row["regression"] else ""
+    line = (
+        f"{row['implementation']:>15} {_filter_label(row):<14} {size:>10}: "
+        f"{row['baseline']:.6f}s -> {row['current']:.6f}s ({row['ratio']:.2f}x){flag}"
+    )
+    if "baseline_memory" in row:
+        memory_flag = "  MEMORY REGRESSION" if row["memory_regression"] else ""
+        line += f", peak {_megabytes(row['baseline_memory'])} -> {_megabytes(row['current_memory'])}{memory_flag}"
+    return line
+
+
+def _parse_size(size: str) -> tuple:
+    width, height = size.lower().split("x")
+    return int(width), int(height)
+
+
+def main(argv=None) -> int:
+    """Run the benchmark suite, or compare two result files, from the command-line"""
+    parser = argparse.ArgumentParser(description="Benchmark the instapy filter implementations")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmark suite")
+    run_parser.add_argument("-o", "--out", help="Write the results to this JSON file", default=None)
+    run_parser.add_argument(
+        "--sizes", nargs="+", type=_parse_size, metavar="WIDTHxHEIGHT", help="Image sizes", default=DEFAULT_SIZES
+    )
+    run_parser.add_argument("--filters", nargs="+", help="Filter names", default=DEFAULT_FILTERS)
+    run_parser.add_argument("-i", "--implementations", nargs="+", help="Implementation names (default: all but python and auto)")
+    run_parser.add_argument(
+        "--radii", nargs="+", type=int, help="Kernel radii for the blur and sharpen filters", default=DEFAULT_RADII
+    )
+    run_parser.add_argument("--warmup", type=int, help="Untimed calls before measuring", default=2)
+    run_parser.add_argument("--repeat", type=int, help="Timed calls", default=7)
+    run_parser.add_argument("--no-memory", action="store_true", help="Don't measure peak memory")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two result files, and flag regressions")
+    compare_parser.add_argument("baseline", help="The results to compare against")
+    compare_parser.add_argument("current", help="The new results")
+    compare_parser.add_argument(
+        "--threshold", type=float, help="Allowed slowdown of the median, as a fraction (default: 0.1)", default=0.1
+    )
+    compare_parser.add_argument(
+        "--memory-threshold", type=float, help="Allowed growth of the peak memory, as a fraction (default: 0.1)", default=0.1
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        suite = run_suite(
+            sizes=args.sizes,
+            filters=args.filters,
+            implementations=args.implementations,
+            warmup=args.warmup,
+            repeat=args.repeat,
+            memory=not args.no_memory,
+            verbose=True,
+            radii=args.radii,
+        )
+        for implementation, filters in suite["skipped"].items():
+            for filter_name, reason in filters.items():
+                print(f"Skipped {filter_name} for {implementation}: {reason}")
+        if args.out:
+            write_results(suite, args.out)
+        return 0
+
+    rows = compare(
+        read_results(args.baseline),
+        read_results(args.current),
+        threshold=args.threshold,
+        memory_threshold=args.memory_threshold,
+    )
+    for row in rows:
+        print(format_comparison(row))
+    regressions = sum(row["regression"] or row.get("memory_regression", False) for row in rows)
+    print(f"{regressions} regressions in {len(rows)} results")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""Content-addressed cache of filtered images
+
+Filtered images are stored under a hash of the input file's bytes and the
+filter parameters (filter, pipeline, scale), so filtering the same image
+the same way again only copies the stored result, without decoding or filtering.
+The implementation is not part of the key: all implementations give the same result,
+within rounding.
+
+The cache is in `$INSTAPY_CACHE_DIR/results` (default: `~/.cache/in3110_instapy/results`),
+and the least recently used results are removed when it grows beyond its size limit.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+# bump when the filters change, so old results are not used
+CACHE_VERSION = 1
+# default size limit of the results, in bytes
+MAX_BYTES = 1024**3
+
+# lookups in this process
+stats = {"hits": 0, "misses": 0}
+
+
+def cache_dir() -> Path:
+    """The directory in3110_instapy caches things in"""
+    directory = os.environ.get("INSTAPY_CACHE_DIR")
+    if directory is None:
+        directory = Path(os.environ.get("XDG_CACHE_HOME", Path.home() / ".cache")) / "in3110_instapy"
+    return Path(directory)
+
+
+def results_dir() -> Path:
+    """The directory the filtered images are stored in"""
+    return cache_dir() / "results"
+
+
+def cache_key(file: str, **params) -> str:
+    """The key of a filtered image
+
+    Args:
+        file (str): the input image file
+        **params: the parameters that change the result, e.g. filter and scale
+    Returns:
+        str: hex digest of the file contents and parameters
+    """
+    digest = hashlib.sha256()
+    with open(file, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    digest.update(json.dumps({"version": CACHE_VERSION, **params}, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def lookup(key: str, out_file: str) -> bool:
+    """Copy the stored result for key to out_file, if there is one
+
+    Results are stored per output format (the suffix of out_file).
+
+    Returns:
+        bool: whether the result was found
+    """
+    path = results_dir() / f"{key}{Path(out_file).suffix.lower()}"
+    try:
+        shutil.copyfile(path, out_file)
+        # mark as recently used
+        os.utime(path)
+    except FileNotFoundError:
+        stats["misses"] += 1
+        return False
+    stats["hits"] += 1
+    return True
+
+
+def store(key: str, out_file: str, max_bytes: int | None = None) -> None:
+    """Store the filtered image in out_file as the result for key
+
+    Args:
+        key (str): the key from cache_key
+        out_file (str): the encoded result
+        max_bytes (int): size limit of the cache (optional, default: MAX_BYTES)
+    """
+    directory = results_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    # write to a temporary file first, so other processes never see a partial result
+    fd, tmp_name = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(out_file, tmp_name)
+        os.replace(tmp_name, directory / f"{key}{Path(out_file).suffix.lower()}")
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+    evict(MAX_BYTES if max_bytes is None else max_bytes)
+
+
+def evict(max_bytes: int) -> None:
+    """Remove the least recently used results, until they take at most max_bytes"""
+    entries = []
+    for path in results_dir().iterdir():
+        if path.suffix == ".tmp":
+            continue
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            # removed by another process
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+def format_stats() -> str:
+    """Format the hits and misses in this process"""
+    return f"Cache: {stats['hits']} hits, {stats['misses']} misses"
@@ -3,16 +3,14 @@ from __future__ import annotations
 
 import argparse
 import sys
+from io import BytesIO
 
 import in3110_instapy
 import numpy as np
 from PIL import Image
 
-from . import io
-from in3110_instapy.timing import time_one
-from in3110_instapy import python_filters
-from in3110_instapy import numpy_filters
-from in3110_instapy import numba_filters
+from . import color_matrix, io
+from .timing import stage
 
 
 def run_filter(
@@ -21,64 +19,155 @@ def run_filter(
     implementation: str = "python",
     filter: str = "color2gray",
     scale: int = 1,
-    runtime: bool = False # for -r
-) -> None:
+    runtime: bool = False, # for -r
+    pipeline: str = None,
+    timings: dict = None,
+    cache: bool = False,
+    cache_size: int | None = None,
+    format: str | None = None,
+    encode: str | None = None,
+    encoder=None,
+):
+
+    """Run the selected filter
+
+    If a color-matrix pipeline specification is given (e.g. 'sepia:0.5,gain:1.1'),
+    the whole pipeline is applied in one pass instead of `filter`.
+
+    If a `timings` dict is given, the time spent in each stage
+    (decode, resize, filter, encode) is added to it, in seconds.
+
+    If `cache` is true, the result is stored in the result cache (see cache.py),
+    and a file that was filtered the same way before is copied from it
+    without decoding or filtering. `cache_size` limits the cache size in bytes.
+
+    `file` and `out_file` can be '-' for stdin and stdout, which are read and written
+    through in-memory buffers, e.g. to use instapy in a shell pipeline.
+    `format` selects the output format (e.g. 'png' or 'jpeg'); by default it follows
+    the extension of out_file, or the format of the input for stdout.
+    `encode` selects an encoder preset, 'fast', 'balanced' or 'small' (see io.ENCODE_PRESETS).
+
+    If an `encoder` executor (e.g. a ThreadPoolExecutor) is given, encoding the result
+    is submitted to it, and the Future is returned (None for cache hits), so the caller
+    can decode and filter the next file meanwhile (PIL's encoders release the GIL).
+    """
+    if timings is None:
+        timings = {}
+
+    # only saved results are cached, and -r needs to run the filter
+    cache = bool(cache and out_file and not runtime) and "-" not in (file, out_file)
+    if cache:
+        from . import cache as result_cache
+
+        with stage(timings, "cache"):
+            key = result_cache.cache_key(
+                file,
+                filter=None if pipeline else filter,
+                pipeline=pipeline,
+                scale=scale,
+                format=format and io.format_name(format),
+                encode=encode,
+            )
+            if result_cache.lookup(key, out_file):
+                return
 
-    """Run the selected filter"""
     # load the image from a file
-    image = Image.open(file)
+    # (JPEG files are decoded at reduced resolution when downscaling)
+    with stage(timings, "decode"):
+        if file == "-":
+            # PIL needs a seekable file
+            file = BytesIO(sys.stdin.buffer.read())
+        image = Image.open(file)
+        if format is None and out_file == "-":
+            format = image.format or "PNG"
+        new_size = io.scaled_size(image.size, scale)
+        image = io.decode_image(image, new_size)
     if scale != 1:
         # Resize image, if needed
-        new_size = (int(image.width * scale), int(image.height * scale))
-        image = image.resize(new_size, Image.ANTIALIAS)
-
-    filter_functions = {
-    "color2gray": {
-        "python": python_filters.python_color2gray,
-        "numba": numba_filters.numba_color2gray_wrapper,    
-        "numpy": numpy_filters.numpy_color2gray     
-    },
-    "color2sepia": {
-        "python": python_filters.python_color2sepia, 
-        "numba": numba_filters.numba_color2sepia_wrapper,    
-        "numpy": numpy_filters.numpy_color2sepia     
-    }
-}
-
-    filter_function = filter_functions[filter][implementation]
+        with stage(timings, "resize"):
+            image = io.resize_image(image, new_size)
+
+    if pipeline is not None:
+        filter_function = color_matrix.pipeline_filter(pipeline)
+    else:
+        # only the selected implementation's module is imported
+        filter_function = in3110_instapy.get_filter(filter, implementation)
+
+    # filters take numpy arrays
+    # (a read-only view of PIL's pixel data, filters never write to their input)
+    with stage(timings, "decode"):
+        image = np.asarray(image)
     
     # If runtime flag is raised, compute and print the average runtime
     if runtime:
+        from .timing import time_one
+
         avg_runtime = time_one(filter_function, image, calls=3)
-        print(f"Average time over 3 runs: {avg_runtime}s")
+        # stdout may be carrying the image
+        print(f"Average time over 3 runs: {avg_runtime}s", file=sys.stderr if out_file == "-" else None)
 
-    filtered = filter_function(image)
+    with stage(timings, "filter"):
+        filtered = filter_function(image)
     
-    if out_file:
-        out_image = Image.fromarray(filtered)
-        out_image.save(out_file)
-        
-    else:
-        # not asked to save, display it
-        io.display(filtered)
+    def encode_result():
+        with stage(timings, "encode"):
+            if out_file == "-":
+                sys.stdout.buffer.write(io.encode_image(filtered, io.format_name(format), preset=encode))
+                sys.stdout.buffer.flush()
+            elif out_file:
+                # encode straight from the filtered array
+                io.write_image(filtered, out_file, format=format and io.format_name(format), preset=encode)
+
+            else:
+                # not asked to save, display it
+                io.display(filtered)
+
+        if cache:
+            with stage(timings, "cache"):
+                result_cache.store(key, out_file, cache_size)
+
+    if encoder is not None:
+        return encoder.submit(encode_result)
+    encode_result()
 
 def main(argv=None):
     """Parse the command-line and call run_filter with the arguments"""
     if argv is None:
         argv = sys.argv[1:]
 
+    if argv[:1] == ["serve"]:
+        # `python3 -m in3110_instapy serve`: the HTTP service, with its own options
+        from .serve import main as serve_main
+
+        return serve_main(argv[1:])
+
     parser = argparse.ArgumentParser(description="Apply image filters using different implementations")
 
-    # filename is positional and required
-    parser.add_argument("file", help="The filename to apply filter to")
+    # filename is positional, and required unless --batch or --stream is given
+    parser.add_argument("file", nargs="?", help="The filename to apply filter to, or - for stdin")
 
     # Output file argument
-    parser.add_argument("-o", "--out", help="The output filename", default=None)
+    parser.add_argument("-o", "--out", help="The output filename, or - for stdout", default=None)
+    parser.add_argument(
+        "--encode",
+        choices=list(io.ENCODE_PRESETS),
+        help="Encoder preset: fast (larger files), balanced or small (slower) (default: PIL's defaults)",
+        default=None,
+    )
+    parser.add_argument("--format", help="The output format, e.g. png or jpeg (default: from the output filename, or the input format for stdout)", default=None)
 
     # Filter type arguments
-    filter_group = parser.add_mutually_exclusive_group(required=True)
+    # one is required, unless --outputs is given
+    filter_group = parser.add_mutually_exclusive_group()
     filter_group.add_argument("-g", "--gray", action="store_true", help="Select gray filter")
     filter_group.add_argument("-se", "--sepia", action="store_true", help="Select sepia filter")
+    filter_group.add_argument("--equalize", action="store_true", help="Equalize the histogram of each channel (numpy, numba_parallel)")
+    filter_group.add_argument("--autolevels", action="store_true", help="Stretch each channel to the full range (numpy, numba_parallel)")
+    filter_group.add_argument(
+        "--pipeline",
+        metavar="STEPS",
+        help=f"Apply a chain of color-matrix filters in one pass, e.g. sepia:0.5,gain:1.1 (steps: {', '.join(color_matrix.MATRICES)})",
+    )
 
     # Bonus -r task
     parser.add_argument("-r", "--runtime", action="store_true", help="Track the average runtime of the chosen implementation.")
@@ -86,16 +175,224 @@ def main(argv=None):
     # Scale argument
     parser.add_argument("-sc", "--scale", type=float, help="Scale factor to resize image", default=1)
 
+    # Batch mode
+    parser.add_argument("--batch", metavar="IN_DIR", help="Filter every image in a directory", default=None)
+    parser.add_argument("--out-dir", help="The output directory for --batch and --outputs", default=None)
+    parser.add_argument("--jobs", type=int, help="Number of worker processes for --batch, or threads for --outputs (default: one per cpu)", default=None)
+
+    # Multi-output mode
+    parser.add_argument("--outputs", nargs="+", metavar="FILTER[:SCALE]", help="Write several filters and sizes of the file to --out-dir, decoding it once, e.g. color2gray:0.5 color2sepia:0.25", default=None)
+
+    # Stream mode
+    parser.add_argument("--stream", metavar="SRC", help="Filter a sequence of frames: a directory of numbered images, or - for raw rgb on stdin (with --raw-size)", default=None)
+
+    # Out-of-core mode
+    parser.add_argument("--max-memory", help="Filter in strips, using at most this much memory, e.g. 512M", default=None)
+    parser.add_argument("--raw-size", metavar="WIDTHxHEIGHT", help="Size of a raw rgb input file or frame (with --max-memory or --stream)", default=None)
+
+    # Result cache
+    parser.add_argument("--cache", action="store_true", help="Reuse the results of filtering the same files the same way before")
+    parser.add_argument("--cache-size", help="Size limit of the result cache, e.g. 2G (default: 1G)", default=None)
+
+    # Profiling
+    parser.add_argument("--profile", choices=["cprofile", "line"], help="Profile the run, and print the time of each stage", default=None)
+    parser.add_argument("--profile-out", help="The file to write profile statistics to (default: instapy-profile.txt)", default="instapy-profile.txt")
+
     # Implementation type
-    parser.add_argument("-i", "--implementation", choices=["python", "numba", "numpy"], 
+    parser.add_argument("-i", "--implementation", choices=in3110_instapy.available_implementations(),
                         help="The implementation", default="python")
 
     args = parser.parse_args(argv)
 
+    if args.jobs is not None and args.jobs < 1:
+        parser.error(f"--jobs must be positive, got {args.jobs}")
+    filter_selected = args.gray or args.sepia or args.equalize or args.autolevels or args.pipeline is not None
+    if args.outputs is None and not filter_selected:
+        parser.error("one of the arguments -g/--gray -se/--sepia --equalize --autolevels --pipeline is required")
+    if args.outputs is not None:
+        if filter_selected:
+            parser.error("--outputs can't be combined with -g, -se, --equalize, --autolevels or --pipeline")
+        if args.file in (None, "-") or args.out_dir is None:
+            parser.error("--outputs requires a file and --out-dir")
+        if args.out is not None or args.batch is not None or args.stream is not None or args.max_memory is not None:
+            parser.error("--outputs can't be combined with -o, --batch, --stream or --max-memory")
+        if args.scale != 1 or args.cache or args.profile is not None or args.format is not None:
+            parser.error("--outputs can't be combined with --scale, --cache, --profile or --format")
+        from .multi import parse_output
+
+        try:
+            args.outputs = [parse_output(spec) for spec in args.outputs]
+        except ValueError as e:
+            parser.error(str(e))
+        for output_filter, _ in args.outputs:
+            try:
+                in3110_instapy.get_filter(output_filter, args.implementation)
+            except (ImportError, AttributeError):
+                # e.g. cython, when the package was built without it
+                parser.error(f"{output_filter} is not implemented by {args.implementation}")
+    if args.batch is None and args.stream is None and args.file is None:
+        parser.error("a file is required, unless --batch or --stream is given")
+    if args.stream is not None:
+        if args.file is not None or args.batch is not None or args.max_memory is not None or args.profile is not None:
+            parser.error("--stream can't be combined with a file, --batch, --max-memory or --profile")
+        if (args.out_dir is None) == (args.out is None) or args.out not in (None, "-"):
+            parser.error("--stream requires either --out-dir, or -o - for raw frames on stdout")
+        if args.stream == "-" and args.raw_size is None:
+            parser.error("--stream - requires --raw-size")
+        if args.scale != 1:
+            parser.error("--stream can't be combined with --scale")
+    if args.batch is not None and (args.file is not None or args.out is not None):
+        parser.error("--batch can't be combined with a file or -o, use --out-dir")
+    if args.batch is not None and args.out_dir is None:
+        parser.error("--batch requires --out-dir")
+    if args.max_memory is not None and (args.out is None or args.scale != 1):
+        parser.error("--max-memory requires -o, and can't be combined with --scale")
+    max_memory = None
+    if args.max_memory is not None:
+        from .strips import parse_size
+
+        try:
+            max_memory = parse_size(args.max_memory)
+        except ValueError as e:
+            parser.error(str(e))
+    if args.raw_size is not None and args.max_memory is None and args.stream is None:
+        parser.error("--raw-size requires --max-memory or --stream")
+    raw_size = None
+    if args.raw_size is not None:
+        try:
+            raw_size = tuple(int(n) for n in args.raw_size.lower().split("x"))
+        except ValueError:
+            raw_size = ()
+        if len(raw_size) != 2 or min(raw_size) < 1:
+            parser.error(f"--raw-size must be WIDTHxHEIGHT with positive integers, got {args.raw_size!r}")
+        if args.max_memory is not None and args.file is not None:
+            try:
+                io.read_raw(args.file, *raw_size)
+            except ValueError as e:
+                parser.error(str(e))
+    if args.profile is not None and (args.batch is not None or args.max_memory is not None):
+        parser.error("--profile can't be combined with --batch or --max-memory")
+    if args.format is not None:
+        try:
+            io.format_name(args.format)
+        except ValueError as e:
+            parser.error(str(e))
+        if args.batch is not None or args.stream is not None or args.max_memory is not None:
+            parser.error("--format can't be combined with --batch, --stream or --max-memory")
+    if args.stream is None and "-" in (args.file, args.out):
+        if args.max_memory is not None or args.cache:
+            parser.error("stdin and stdout (-) can't be combined with --max-memory or --cache")
+        if args.profile is not None and args.out == "-":
+            parser.error("--profile can't be combined with -o -")
+    if args.cache and (args.stream is not None or args.max_memory is not None or args.profile is not None):
+        parser.error("--cache can't be combined with --stream, --max-memory or --profile")
+    if args.cache and args.batch is None and args.out is None:
+        parser.error("--cache requires -o or --batch")
+    if args.cache_size is not None and not args.cache:
+        parser.error("--cache-size requires --cache")
+    if args.pipeline is not None:
+        if args.batch is not None or args.max_memory is not None:
+            parser.error("--pipeline can't be combined with --batch or --max-memory")
+        try:
+            color_matrix.parse_pipeline(args.pipeline)
+        except ValueError as e:
+            parser.error(str(e))
+
     # Check which filter was selected and call the respective function
     if args.gray:
         filter = "color2gray"
+    elif args.equalize:
+        filter = "equalize"
+    elif args.autolevels:
+        filter = "autolevels"
     else:
         filter = "color2sepia"
 
-    run_filter(args.file, out_file=args.out, implementation=args.implementation, filter=filter, scale=args.scale, runtime=args.runtime)
\ No newline at end of file
+    if filter in ("equalize", "autolevels"):
+        # the histogram of one strip is not the histogram of the image
+        if args.max_memory is not None:
+            parser.error(f"--{filter} can't be combined with --max-memory")
+        try:
+            in3110_instapy.get_filter(filter, args.implementation)
+        except (ImportError, AttributeError):
+            # e.g. cython, when the package was built without it
+            parser.error(f"--{filter} is not implemented by {args.implementation}")
+
+    cache_size = None
+    if args.cache_size is not None:
+        from .strips import parse_size
+
+        try:
+            cache_size = parse_size(args.cache_size)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.batch is not None:
+        from .batch import print_summary, run_batch
+
+        summary = run_batch(
+            args.batch,
+            args.out_dir,
+            implementation=args.implementation,
+            filter=filter,
+            scale=args.scale,
+            jobs=args.jobs,
+            cache=args.cache,
+            cache_size=cache_size,
+            encode=args.encode,
+        )
+        print_summary(summary)
+        return
+
+    if args.outputs is not None:
+        from .multi import run_outputs
+        from .timing import format_stages
+
+        timings = {}
+        out_files = run_outputs(args.file, args.outputs, args.out_dir, implementation=args.implementation, jobs=args.jobs, timings=timings, encode=args.encode)
+        for out_file in out_files:
+            print(f"Wrote {out_file}")
+        print(format_stages(timings))
+        return
+
+    if args.stream is not None:
+        from .stream import print_summary, run_stream
+
+        summary = run_stream(
+            args.stream,
+            args.out or args.out_dir,
+            implementation=args.implementation,
+            filter=filter,
+            pipeline=args.pipeline,
+            raw_size=raw_size,
+            encode=args.encode,
+        )
+        # stdout may be carrying the frames
+        print_summary(summary, file=sys.stderr if args.out == "-" else None)
+        return
+
+    if args.max_memory is not None:
+        from .strips import run_strips
+
+        run_strips(
+            args.file,
+            args.out,
+            implementation=args.implementation,
+            filter=filter,
+            max_memory=max_memory,
+            raw_size=raw_size,
+            encode=args.encode,
+        )
+        return
+
+    if args.profile is not None:
+        from .profiling import profile_run
+
+        profile_run(args.profile, args.profile_out, args.file, out_file=args.out, implementation=args.implementation, filter=filter, scale=args.scale, pipeline=args.pipeline, format=args.format, encode=args.encode)
+        return
+
+    run_filter(args.file, out_file=args.out, implementation=args.implementation, filter=filter, scale=args.scale, runtime=args.runtime, pipeline=args.pipeline, cache=args.cache, cache_size=cache_size, format=args.format, encode=args.encode)
+    if args.cache:
+        from .cache import format_stats
+
+        print(format_stats())
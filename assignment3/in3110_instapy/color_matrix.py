@@ -0,0 +1,130 @@
+"""color-matrix filters, and pipelines fusing several of them into one pass
+
+Filters that compute each output channel as a linear combination
+of the input channels are 3x3 matrices.
+A chain of such filters is the product of their matrices,
+so the whole chain can be applied with a single pass over the pixels.
+
+Unlike applying the filters one after another,
+the fused pipeline only clips to [0, 255] once, at the end.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from . import _output_array
+
+GRAY_WEIGHTS = np.array([0.21, 0.72, 0.07])
+SEPIA_MATRIX = np.array([
+    [0.393, 0.769, 0.189],
+    [0.349, 0.686, 0.168],
+    [0.272, 0.534, 0.131]
+])
+
+
+def sepia_matrix(k: float = 1) -> np.array:
+    """The sepia matrix, blended with identity by the amount of sepia k in [0, 1]"""
+    if not 0 <= k <= 1:
+        # validate k
+        raise ValueError(f"k must be between [0-1], got {k=}")
+    return k * SEPIA_MATRIX + (1 - k) * np.identity(3)
+
+
+def gray_matrix() -> np.array:
+    """The grayscale transform, with the gray value in all three channels"""
+    return np.tile(GRAY_WEIGHTS, (3, 1))
+
+
+def gain_matrix(r: float, g: float | None = None, b: float | None = None) -> np.array:
+    """Multiply each channel by a gain, the same gain for all channels if only one is given"""
+    if g is None and b is None:
+        g = b = r
+    elif g is None or b is None:
+        raise ValueError("give either one gain, or one per channel")
+    return np.diag([r, g, b]).astype(np.float64)
+
+
+def saturation_matrix(s: float) -> np.array:
+    """Scale the saturation: s=0 is gray, s=1 is unchanged, s>1 is more saturated"""
+    return s * np.identity(3) + (1 - s) * gray_matrix()
+
+
+# the steps a pipeline can be built from, by name
+MATRICES = {
+    "sepia": sepia_matrix,
+    "gray": gray_matrix,
+    "gain": gain_matrix,
+    "saturation": saturation_matrix,
+}
+
+
+def compose(*matrices: np.array) -> np.array:
+    """Compose color matrices into one, applying them in the order given"""
+    result = np.identity(3)
+    for matrix in matrices:
+        result = matrix @ result
+    return result
+
+
+def parse_pipeline(spec: str) -> np.array:
+    """Build the matrix of a pipeline specification
+
+    The specification is a comma-separated list of steps,
+    each a name from MATRICES, optionally with colon-separated arguments,
+    e.g. 'sepia:0.5,gain:1.1' or 'saturation:1.5,gain:1.1:1:0.9'.
+
+    Args:
+        spec (str): the pipeline specification
+    Returns:
+        np.array: the 3x3 matrix of the whole pipeline
+    """
+    matrices = []
+    for step in spec.split(","):
+        name, *args = step.strip().split(":")
+        if name not in MATRICES:
+            raise ValueError(f"Unknown pipeline step {name!r}, must be one of {', '.join(MATRICES)}")
+        try:
+            matrices.append(MATRICES[name](*(float(arg) for arg in args)))
+        except TypeError:
+            raise ValueError(f"Wrong number of arguments for pipeline step {step!r}") from None
+    return compose(*matrices)
+
+
+def apply_color_matrix(image: np.array, matrix: np.array, out: np.array = None, scratch: np.array = None) -> np.array:
+    """Apply a color matrix to an rgb pixel array in one pass
+
+    Args:
+        image (np.array)
+        matrix (np.array): 3x3 color matrix, output channels by input channels
+        out (np.array): array to write the result to (optional)
+        scratch (np.array): float64 work array of the same shape as image (optional)
+    Returns:
+        np.array: filtered_image
+    """
+    image = np.asarray(image)
+    filtered_image = _output_array(out, image.shape)
+    scratch = _output_array(scratch, image.shape, dtype=np.float64)
+
+    np.einsum("...i,ij->...j", image, np.asarray(matrix).T, out=scratch)
+    np.clip(scratch, 0, 255, out=scratch)
+    np.copyto(filtered_image, scratch, casting="unsafe")
+    return filtered_image
+
+
+def pipeline_filter(spec: str):
+    """Return a filter function applying a whole pipeline in one pass
+
+    Args:
+        spec (str): the pipeline specification (see parse_pipeline)
+    Returns:
+        filter_function (function):
+            taking an image (and optionally out and scratch arrays)
+            and returning the filtered image
+    """
+    matrix = parse_pipeline(spec)
+
+    def color_matrix_filter(image: np.array, out: np.array = None, scratch: np.array = None) -> np.array:
+        return apply_color_matrix(image, matrix, out=out, scratch=scratch)
+
+    color_matrix_filter.__doc__ = f"Apply the color-matrix pipeline {spec!r}"
+    return color_matrix_filter
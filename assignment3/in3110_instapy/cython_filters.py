@@ -4,6 +4,9 @@ from __future__ import annotations
 import cython as C
 import numpy as np
 from cython.cimports.libc.stdint import uint8_t
+from cython.parallel import prange
+
+from . import _output_array
 
 if not C.compiled:
     raise ImportError(
@@ -15,23 +18,78 @@ const_uint8_t = C.typedef("const uint8_t")
 float64_t = C.typedef(C.double)
 
 
-def cython_color2gray(image):
+@C.cfunc
+@C.nogil
+@C.exceptval(check=False)
+@C.inline
+def _clip(value: float64_t) -> uint8_t:
+    """Truncate a channel value to uint8, saturating at 255"""
+    if value > 255:
+        return 255
+    return C.cast(uint8_t, value)
+
+
+@C.boundscheck(False)
+@C.wraparound(False)
+def _color2gray(image: const_uint8_t[:, :, ::1], gray_image: uint8_t[:, ::1]) -> None:
+    """Fill gray_image with the grayscale transform of image, in parallel over rows"""
+    rows: C.Py_ssize_t = image.shape[0]
+    cols: C.Py_ssize_t = image.shape[1]
+    i: C.Py_ssize_t
+    j: C.Py_ssize_t
+
+    for i in prange(rows, nogil=True):
+        for j in range(cols):
+            gray_image[i, j] = _clip(image[i, j, 0] * 0.21 + image[i, j, 1] * 0.72 + image[i, j, 2] * 0.07)
+
+
+@C.boundscheck(False)
+@C.wraparound(False)
+def _color2sepia(image: const_uint8_t[:, :, ::1], sepia_image: uint8_t[:, :, ::1]) -> None:
+    """Fill sepia_image with the sepia transform of image, in parallel over rows"""
+    height: C.Py_ssize_t = image.shape[0]
+    width: C.Py_ssize_t = image.shape[1]
+    y: C.Py_ssize_t
+    x: C.Py_ssize_t
+    r: float64_t
+    g: float64_t
+    b: float64_t
+
+    for y in prange(height, nogil=True):
+        for x in range(width):
+            r = image[y, x, 0]
+            g = image[y, x, 1]
+            b = image[y, x, 2]
+            sepia_image[y, x, 0] = _clip(0.393 * r + 0.769 * g + 0.189 * b)
+            sepia_image[y, x, 1] = _clip(0.349 * r + 0.686 * g + 0.168 * b)
+            sepia_image[y, x, 2] = _clip(0.272 * r + 0.534 * g + 0.131 * b)
+
+
+def cython_color2gray(image, out=None):
     """Convert rgb pixel array to grayscale
 
     Args:
         image (np.array)
+        out (np.array): array to write the result to (optional)
     Returns:
         np.array: gray_image
     """
-    ...
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    gray_image = _output_array(out, image.shape[:2])
+    _color2gray(image, gray_image)
+    return gray_image
 
 
-def cython_color2sepia(image):
+def cython_color2sepia(image, out=None):
     """Convert rgb pixel array to sepia
 
     Args:
         image (np.array)
+        out (np.array): array to write the result to (optional)
     Returns:
-        np.array: gray_image
+        np.array: sepia_image
     """
-    ...
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    sepia_image = _output_array(out, image.shape)
+    _color2sepia(image, sepia_image)
+    return sepia_image
@@ -0,0 +1,45 @@
+"""Convolution kernels for the blur and sharpen filters
+
+The kernels are separable: the 2D kernel is the outer product of a 1D kernel
+with itself, so the filters convolve the rows with the 1D kernel, then the columns,
+which costs O(k) instead of O(k²) per pixel for a kernel of size k.
+The box blur uses running sums instead, which cost O(1) per pixel for any size.
+
+At the edges of the image, the edge pixels are repeated.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+# filters taking a kernel `radius`, implemented by python, numpy and numba
+KERNEL_FILTERS = ["blur", "box_blur", "sharpen"]
+
+
+def check_radius(radius: int) -> None:
+    """Raise ValueError for kernel radii that are not non-negative integers"""
+    if int(radius) != radius or radius < 0:
+        raise ValueError(f"radius must be a non-negative integer, got {radius=}")
+
+
+def gaussian_kernel(radius: int, sigma: float | None = None) -> np.array:
+    """The 1D gaussian kernel of size 2 * radius + 1
+
+    Args:
+        radius (int): the kernel radius in pixels
+        sigma (float): the standard deviation (optional, default: radius / 2)
+    Returns:
+        np.array: float64 weights that sum to 1
+    """
+    check_radius(radius)
+    if sigma is None:
+        sigma = max(radius / 2, 0.5)
+    if sigma <= 0:
+        raise ValueError(f"sigma must be positive, got {sigma=}")
+    x = np.arange(-radius, radius + 1)
+    kernel = np.exp(-(x**2) / (2 * sigma**2))
+    return kernel / kernel.sum()
+
+
+def as_channels(image: np.array) -> np.array:
+    """View a gray (height, width) or color (height, width, channels) image as (height, width, channels)"""
+    return image.reshape(image.shape[0], image.shape[1], -1)
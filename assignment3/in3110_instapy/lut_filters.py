@@ -0,0 +1,106 @@
+"""lookup-table implementation of image filters
+
+Both filters are linear combinations of the 8-bit channels,
+so the contribution of each input channel to each output channel
+can be precomputed for all 256 values.
+Filtering is then only table lookups (gathers), integer adds, a shift and a clamp.
+The tables are fixed-point, scaled by 2**16, and cached for each `k`.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+
+import numpy as np
+
+from . import _output_array
+
+SHIFT = 16
+
+GRAY_WEIGHTS = np.array([0.21, 0.72, 0.07])
+SEPIA_MATRIX = np.array([
+    [0.393, 0.769, 0.189],
+    [0.349, 0.686, 0.168],
+    [0.272, 0.534, 0.131]
+])
+
+
+def _make_tables(matrix: np.array) -> np.array:
+    """Tables of shape (outputs, 3, 256): tables[c, i, v] = matrix[c, i] * v, in fixed point"""
+    values = np.arange(256)
+    tables = np.round(matrix[:, :, np.newaxis] * values * (1 << SHIFT)).astype(np.uint32)
+    # the tables are shared by every call, so make sure nobody modifies them
+    tables.flags.writeable = False
+    return tables
+
+
+@lru_cache()
+def gray_tables() -> np.array:
+    """The (1, 3, 256) lookup tables for color2gray"""
+    return _make_tables(GRAY_WEIGHTS[np.newaxis, :])
+
+
+@lru_cache()
+def sepia_tables(k: float = 1) -> np.array:
+    """The (3, 3, 256) lookup tables for color2sepia with a given amount of sepia"""
+    return _make_tables(k * SEPIA_MATRIX + (1 - k) * np.identity(3))
+
+
+def _lookup_sum(image: np.array, tables: np.array, out: np.array, acc: np.array, term: np.array) -> None:
+    """out = min(sum_i tables[i][image[..., i]] >> SHIFT, 255), using acc and term as work arrays"""
+    # mode="clip" avoids buffering, uint8 indices are always in range
+    np.take(tables[0], image[:, :, 0], out=acc, mode="clip")
+    for channel in (1, 2):
+        np.take(tables[channel], image[:, :, channel], out=term, mode="clip")
+        acc += term
+    acc >>= SHIFT
+    np.minimum(acc, 255, out=acc)
+    np.copyto(out, acc, casting="unsafe")
+
+
+def lut_color2gray(image: np.array, out: np.array = None, scratch: np.array = None) -> np.array:
+    """Convert rgb pixel array to grayscale with lookup tables
+
+    Args:
+        image (np.array)
+        out (np.array): array to write the result to (optional)
+        scratch (np.array): uint32 work array of shape (2, height, width) (optional)
+    Returns:
+        np.array: gray_image
+    """
+    image = np.asarray(image)
+    rows, cols = image.shape[:2]
+    gray_image = _output_array(out, (rows, cols))
+    acc, term = _output_array(scratch, (2, rows, cols), dtype=np.uint32)
+
+    _lookup_sum(image, gray_tables()[0], gray_image, acc, term)
+    return gray_image
+
+
+def lut_color2sepia(image: np.array, k: float = 1, out: np.array = None, scratch: np.array = None) -> np.array:
+    """Convert rgb pixel array to sepia with lookup tables
+
+    Args:
+        image (np.array)
+        k (float): amount of sepia (optional)
+        out (np.array): array to write the result to (optional)
+        scratch (np.array): uint32 work array of shape (2, height, width) (optional)
+
+    The amount of sepia is given as a fraction, k=0 yields no sepia while
+    k=1 yields full sepia.
+
+    Returns:
+        np.array: sepia_image
+    """
+    if not 0 <= k <= 1:
+        # validate k
+        raise ValueError(f"k must be between [0-1], got {k=}")
+
+    image = np.asarray(image)
+    rows, cols = image.shape[:2]
+    sepia_image = _output_array(out, image.shape)
+    acc, term = _output_array(scratch, (2, rows, cols), dtype=np.uint32)
+
+    tables = sepia_tables(float(k))
+    for channel in range(3):
+        _lookup_sum(image, tables[channel], sepia_image[:, :, channel], acc, term)
+    return sepia_image
@@ -0,0 +1,111 @@
+"""Multi-output mode: several filters and sizes of one image, decoded once
+
+Making e.g. gray and sepia thumbnails at three sizes with run_filter
+decodes the same file six times. Here, the file is decoded once
+(at reduced resolution for JPEG files, see io.decode_image),
+resized to each requested size from the next larger one (a resize pyramid),
+and every filter is applied to the shared resized images.
+Filtering and encoding the outputs runs on a thread pool,
+since numpy and PIL's encoders release the GIL.
+"""
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from . import get_filter, io
+from .timing import stage
+
+
+def parse_output(spec: str) -> tuple:
+    """Parse an output specification 'FILTER[:SCALE]', e.g. 'color2sepia:0.5'
+
+    Returns:
+        (str, float): the filter name and scale
+    """
+    filter, _, scale = spec.partition(":")
+    try:
+        scale = float(scale or 1)
+    except ValueError:
+        raise ValueError(f"Invalid scale in output {spec!r}")
+    if not filter or not 0 < scale <= 1:
+        raise ValueError(f"Invalid output {spec!r}, expected FILTER[:SCALE] with 0 < SCALE <= 1")
+    return filter, scale
+
+
+def output_filename(file: str, out_dir: str, filter: str, scale: float) -> Path:
+    """The output file for a filter and scale, e.g. out_dir/rain_color2gray_0.5.jpg"""
+    path = Path(file)
+    return Path(out_dir) / f"{path.stem}_{filter}_{scale:g}{path.suffix}"
+
+
+def run_outputs(
+    file: str,
+    outputs: list,
+    out_dir: str,
+    implementation: str = "numpy",
+    jobs: int | None = None,
+    timings: dict | None = None,
+    encode: str | None = None,
+) -> list:
+    """Make several filtered and resized versions of an image, decoding it once
+
+    Args:
+        file (str): the image file
+        outputs (list): (filter, scale) of each output
+        out_dir (str): the directory to write the outputs to (see output_filename)
+        implementation (str): the filter implementation
+        jobs (int): number of threads filtering and encoding the outputs (optional, default: one per cpu)
+        timings (dict): time spent in each stage, in seconds (optional, see cli.run_filter)
+            filter and encode are summed over the threads
+        encode (str): the encoder preset, see io.ENCODE_PRESETS (optional)
+    Returns:
+        list of Path: the output files, in the order of outputs
+            (outputs with the same file, e.g. 'color2gray' and 'color2gray:1.0', are made once)
+    """
+    if jobs is not None and jobs < 1:
+        raise ValueError(f"jobs must be positive, got {jobs=}")
+    if timings is None:
+        timings = {}
+    # two threads must not write the same file
+    unique = {}
+    for filter, scale in outputs:
+        unique.setdefault(output_filename(file, out_dir, filter, scale), (filter, scale))
+    outputs = list(unique.values())
+    filter_functions = {filter: get_filter(filter, implementation) for filter, _ in outputs}
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    with stage(timings, "decode"):
+        image = Image.open(file)
+        original_size = image.size
+        # decode at the resolution needed for the largest output
+        largest = io.scaled_size(original_size, max(scale for _, scale in outputs))
+        image = io.decode_image(image, largest)
+
+    # resize each level from the next larger one
+    levels = {}
+    with stage(timings, "resize"):
+        for scale in sorted({scale for _, scale in outputs}, reverse=True):
+            image = io.resize_image(image, io.scaled_size(original_size, scale))
+            levels[scale] = np.asarray(image)
+
+    def filter_and_encode(output):
+        filter, scale = output
+        out_file = output_filename(file, out_dir, filter, scale)
+        start = time.perf_counter()
+        filtered = filter_functions[filter](levels[scale])
+        filtered_at = time.perf_counter()
+        io.write_image(filtered, out_file, preset=encode)
+        return out_file, filtered_at - start, time.perf_counter() - filtered_at
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as pool:
+        results = list(pool.map(filter_and_encode, outputs))
+    timings["filter"] = timings.get("filter", 0) + sum(seconds for _, seconds, _ in results)
+    timings["encode"] = timings.get("encode", 0) + sum(seconds for _, _, seconds in results)
+    return [out_file for out_file, _, _ in results]
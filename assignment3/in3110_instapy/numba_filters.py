@@ -4,34 +4,43 @@ from __future__ import annotations
 from PIL import Image
 import numpy as np
 from numba import jit
+
+from . import _output_array
+from .kernels import as_channels, check_radius, gaussian_kernel
 # These are used for computing things no python can't handle::::::::::::::::::::::
 def convert_to_numpy(image_input) -> np.array:
     """Convert the input to a numpy array if it's a PIL Image."""
     if isinstance(image_input, Image.Image):
-        return np.array(image_input)
+        return np.asarray(image_input)
     return image_input
 
-def numba_color2sepia_wrapper(image_input):
+def numba_color2sepia_wrapper(image_input, out=None):
     """Wrapper function to handle the conversion and then call the Numba function."""
     image = convert_to_numpy(image_input)
-    return numba_color2sepia(image)
+    return numba_color2sepia(image, out)
 
-def numba_color2gray_wrapper(image_input):
+def numba_color2gray_wrapper(image_input, out=None):
     image = convert_to_numpy(image_input)
-    return numba_color2gray(image)
+    return numba_color2gray(image, out)
 #:::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
 
 @jit(nopython = True)
-def numba_color2gray(image: np.array) -> np.array:
+def numba_color2gray(image: np.array, out: np.array = None) -> np.array:
     """Convert rgb pixel array to grayscale
 
     Args:
         image (np.array)
+        out (np.array): array to write the result to (optional)
     Returns:
         np.array: gray_image
     """
     rows, cols, _ = image.shape
-    gray_image = np.empty((rows, cols), dtype = np.float64)
+    if out is None:
+        gray_image = np.empty((rows, cols), dtype = np.uint8)
+    elif out.shape != (rows, cols):
+        raise ValueError("out must have the shape of a gray image")
+    else:
+        gray_image = out
     # iterate through the pixels, and apply the grayscale transform
  
     for i in range(rows):
@@ -39,23 +48,26 @@ def numba_color2gray(image: np.array) -> np.array:
             r, g, b = image[i, j]
             gray = int(r * 0.21 + g * 0.72 + b * 0.07)
             gray_image[i, j] = gray
-    ...
-
-    gray_image = gray_image.astype(np.uint8)
 
     return gray_image
 
 @jit(nopython = True)
-def numba_color2sepia(image: np.array) -> np.array:
+def numba_color2sepia(image: np.array, out: np.array = None) -> np.array:
     """Convert rgb pixel array to sepia
 
     Args:
         image (np.array)
+        out (np.array): array to write the result to (optional)
     Returns:
         np.array: sepia_image
     """
-    sepia_image = np.empty_like(image)
     height, width, _ = image.shape
+    if out is None:
+        sepia_image = np.empty((height, width, 3), dtype = np.uint8)
+    elif out.shape != (height, width, 3):
+        raise ValueError("out must have the shape of the image")
+    else:
+        sepia_image = out
 
     for y in range(height):
         for x in range(width):
@@ -66,3 +78,114 @@ def numba_color2sepia(image: np.array) -> np.array:
             sepia_image[y, x] = [min(255, tr), min(255, tg), min(255, tb)]
 
     return sepia_image
+
+
+@jit(nopython=True)
+def _numba_convolve(image: np.array, kernel: np.array, weight: float, out: np.array) -> None:
+    """Convolve the rows, then the columns, of a (height, width, channels) image with a 1D kernel
+
+    Writes blurred + weight * (image - blurred), rounded and clipped, to out:
+    weight 0 is the blur itself, and weight 1 + amount sharpens by amount.
+    """
+    height, width, channels = image.shape
+    radius = len(kernel) // 2
+    rows = np.empty((height, width, channels))
+    for y in range(height):
+        for x in range(width):
+            for c in range(channels):
+                total = 0.0
+                for i in range(len(kernel)):
+                    # repeat the edge pixels outside the image
+                    total += kernel[i] * image[y, min(max(x + i - radius, 0), width - 1), c]
+                rows[y, x, c] = total
+
+    for y in range(height):
+        for x in range(width):
+            for c in range(channels):
+                value = 0.0
+                for i in range(len(kernel)):
+                    value += kernel[i] * rows[min(max(y + i - radius, 0), height - 1), x, c]
+                if weight:
+                    value += weight * (image[y, x, c] - value)
+                out[y, x, c] = min(255.0, max(0.0, np.rint(value)))
+
+
+@jit(nopython=True)
+def _numba_box_blur(image: np.array, radius: int, out: np.array) -> None:
+    """Box blur a (height, width, channels) image into out, with running sums along the rows, then the columns"""
+    height, width, channels = image.shape
+    area = (2 * radius + 1) ** 2
+    row_sums = np.empty((height, width, channels), dtype=np.int64)
+    for y in range(height):
+        for c in range(channels):
+            # the window around x = 0, with the edge repeated
+            window = 0
+            for i in range(-radius, radius + 1):
+                window += image[y, min(max(i, 0), width - 1), c]
+            for x in range(width):
+                row_sums[y, x, c] = window
+                # slide the window: add the value entering it, subtract the one leaving
+                window += image[y, min(x + radius + 1, width - 1), c] - np.int64(image[y, max(x - radius, 0), c])
+
+    for x in range(width):
+        for c in range(channels):
+            window = 0
+            for i in range(-radius, radius + 1):
+                window += row_sums[min(max(i, 0), height - 1), x, c]
+            for y in range(height):
+                # rounded mean
+                out[y, x, c] = (window + area // 2) // area
+                window += row_sums[min(y + radius + 1, height - 1), x, c] - row_sums[max(y - radius, 0), x, c]
+
+
+def numba_blur(image: np.array, radius: int = 2, sigma: float | None = None, out: np.array = None) -> np.array:
+    """Gaussian blur, with separable row and column passes
+
+    Args:
+        image (np.array): gray or rgb image
+        radius (int): the kernel radius in pixels (optional)
+        sigma (float): the standard deviation of the gaussian (optional, default: radius / 2)
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: blurred_image
+    """
+    image = convert_to_numpy(image)
+    blurred_image = _output_array(out, image.shape)
+    _numba_convolve(as_channels(image), gaussian_kernel(radius, sigma), 0.0, as_channels(blurred_image))
+    return blurred_image
+
+
+def numba_sharpen(image: np.array, radius: int = 1, amount: float = 1, out: np.array = None) -> np.array:
+    """Sharpen with an unsharp mask: image + amount * (image - blurred image)
+
+    Args:
+        image (np.array): gray or rgb image
+        radius (int): the radius of the gaussian blur in pixels (optional)
+        amount (float): how much to sharpen (optional)
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: sharpened_image
+    """
+    image = convert_to_numpy(image)
+    sharpened_image = _output_array(out, image.shape)
+    _numba_convolve(as_channels(image), gaussian_kernel(radius), 1.0 + amount, as_channels(sharpened_image))
+    return sharpened_image
+
+
+def numba_box_blur(image: np.array, radius: int = 2, out: np.array = None) -> np.array:
+    """Box blur: the mean of the (2 * radius + 1)² neighborhood, from running sums
+
+    The cost of the running sums does not depend on the radius.
+
+    Args:
+        image (np.array): gray or rgb image
+        radius (int): the box radius in pixels (optional)
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: blurred_image
+    """
+    check_radius(radius)
+    image = convert_to_numpy(image)
+    blurred_image = _output_array(out, image.shape)
+    _numba_box_blur(as_channels(image), int(radius), as_channels(blurred_image))
+    return blurred_image
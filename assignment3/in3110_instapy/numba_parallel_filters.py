@@ -0,0 +1,147 @@
+"""parallel numba-optimized filters
+
+Rows are distributed over threads with `prange`,
+and compiled functions are cached on disk,
+so repeated runs do not pay for compilation again.
+"""
+from __future__ import annotations
+
+import numpy as np
+from numba import get_num_threads, njit, prange
+
+from . import _output_array
+from .kernels import as_channels
+from .numba_filters import convert_to_numpy
+from .tone import autolevels_tables, equalize_tables
+
+
+def numba_parallel_color2gray_wrapper(image_input, out=None):
+    """Wrapper function to handle the conversion and then call the Numba function."""
+    image = convert_to_numpy(image_input)
+    return numba_parallel_color2gray(image, out)
+
+
+def numba_parallel_color2sepia_wrapper(image_input, out=None):
+    """Wrapper function to handle the conversion and then call the Numba function."""
+    image = convert_to_numpy(image_input)
+    return numba_parallel_color2sepia(image, out)
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def numba_parallel_color2gray(image: np.array, out: np.array = None) -> np.array:
+    """Convert rgb pixel array to grayscale
+
+    Args:
+        image (np.array)
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: gray_image
+    """
+    rows, cols, _ = image.shape
+    if out is None:
+        gray_image = np.empty((rows, cols), dtype=np.uint8)
+    elif out.shape != (rows, cols):
+        raise ValueError("out must have the shape of a gray image")
+    else:
+        gray_image = out
+
+    for i in prange(rows):
+        for j in range(cols):
+            gray = image[i, j, 0] * 0.21 + image[i, j, 1] * 0.72 + image[i, j, 2] * 0.07
+            gray_image[i, j] = np.uint8(gray)
+
+    return gray_image
+
+
+@njit(parallel=True, fastmath=True, cache=True)
+def numba_parallel_color2sepia(image: np.array, out: np.array = None) -> np.array:
+    """Convert rgb pixel array to sepia
+
+    Args:
+        image (np.array)
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: sepia_image
+    """
+    height, width, _ = image.shape
+    if out is None:
+        sepia_image = np.empty((height, width, 3), dtype=np.uint8)
+    elif out.shape != (height, width, 3):
+        raise ValueError("out must have the shape of the image")
+    else:
+        sepia_image = out
+
+    for y in prange(height):
+        for x in range(width):
+            r = image[y, x, 0]
+            g = image[y, x, 1]
+            b = image[y, x, 2]
+            # write each channel separately, to avoid building a list per pixel
+            sepia_image[y, x, 0] = np.uint8(min(255.0, 0.393 * r + 0.769 * g + 0.189 * b))
+            sepia_image[y, x, 1] = np.uint8(min(255.0, 0.349 * r + 0.686 * g + 0.168 * b))
+            sepia_image[y, x, 2] = np.uint8(min(255.0, 0.272 * r + 0.534 * g + 0.131 * b))
+
+    return sepia_image
+
+
+@njit(parallel=True, cache=True)
+def _parallel_histograms(image: np.array, nthreads: int) -> np.array:
+    """Count the values of each channel of a (height, width, channels) image
+
+    Each thread counts a block of rows into its own partial histograms,
+    so no counts are shared between threads, and the partial histograms are added at the end.
+    """
+    height, width, channels = image.shape
+    partial = np.zeros((nthreads, channels, 256), dtype=np.int64)
+    block = (height + nthreads - 1) // nthreads
+    for t in prange(nthreads):
+        for y in range(t * block, min((t + 1) * block, height)):
+            for x in range(width):
+                for c in range(channels):
+                    partial[t, c, image[y, x, c]] += 1
+    return partial.sum(axis=0)
+
+
+@njit(parallel=True, cache=True)
+def _parallel_remap(image: np.array, tables: np.array, out: np.array) -> None:
+    """out[..., c] = tables[c][image[..., c]], in parallel over rows"""
+    height, width, channels = image.shape
+    for y in prange(height):
+        for x in range(width):
+            for c in range(channels):
+                out[y, x, c] = tables[c, image[y, x, c]]
+
+
+def _parallel_tone(image: np.array, make_tables, out: np.array) -> np.array:
+    """Count the histograms of image, and remap it through make_tables(histograms) into out"""
+    image = convert_to_numpy(image)
+    toned_image = _output_array(out, image.shape)
+    channel_image = as_channels(image)
+    tables = make_tables(_parallel_histograms(channel_image, get_num_threads()))
+    _parallel_remap(channel_image, tables, as_channels(toned_image))
+    return toned_image
+
+
+def numba_parallel_equalize(image: np.array, out: np.array = None) -> np.array:
+    """Equalize the histogram of each channel, spreading its values evenly over 0-255
+
+    Args:
+        image (np.array): gray or rgb image
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: equalized_image
+    """
+    return _parallel_tone(image, equalize_tables, out)
+
+
+def numba_parallel_autolevels(image: np.array, cutoff: float = 0, out: np.array = None) -> np.array:
+    """Stretch the values of each channel to the full 0-255 range
+
+    Args:
+        image (np.array): gray or rgb image
+        cutoff (float): percent of the darkest and brightest values to ignore (optional)
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: leveled_image
+    """
+    return _parallel_tone(image, lambda histograms: autolevels_tables(histograms, cutoff), out)
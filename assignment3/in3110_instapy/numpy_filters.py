@@ -3,37 +3,61 @@ from __future__ import annotations
 from PIL import Image
 import numpy as np
 
+from . import _output_array
+from .kernels import as_channels, check_radius, gaussian_kernel
+from .tone import autolevels_tables, equalize_tables
 
-def numpy_color2gray(image: np.array) -> np.array:
+
+def numpy_color2gray(image: np.array, out: np.array = None, scratch: np.array = None) -> np.array:
     """Convert rgb pixel array to grayscale
 
     Args:
         image (np.array)
+        out (np.array): array to write the result to (optional)
+        scratch (np.array): float32 work array of shape (2, height, width) (optional)
+
+    Passing the same out and scratch arrays to every call avoids
+    allocating any memory, e.g. when filtering video frames.
+
     Returns:
         np.array: gray_image
     """
-    image_array = np.array(image)
-    image_float = image_array.astype(np.float32)
+    image_array = np.asarray(image)
+    rows, cols = image_array.shape[:2]
+    gray_image = _output_array(out, (rows, cols))
+    scratch = _output_array(scratch, (2, rows, cols), dtype=np.float32)
 
     # Hint: use numpy slicing in order to have fast vectorized code
 
-    gray_image = np.round(image_float[:,:,0] * 0.21 + image_float[:,:,1] * 0.72 + image_float[:,:,2] * 0.07).astype(np.uint8)
+    # r * 0.21 + g * 0.72 + b * 0.07 in float32, without temporaries
+    weighted_sum, term = scratch
+    np.multiply(image_array[:, :, 0], np.float32(0.21), out=weighted_sum)
+    np.multiply(image_array[:, :, 1], np.float32(0.72), out=term)
+    weighted_sum += term
+    np.multiply(image_array[:, :, 2], np.float32(0.07), out=term)
+    weighted_sum += term
+    np.round(weighted_sum, out=weighted_sum)
 
-    gray_image = gray_image.astype(np.uint8)
     # Return image (make sure it's the right type!)
+    np.copyto(gray_image, weighted_sum, casting="unsafe")
     return gray_image
 
 
-def numpy_color2sepia(image: np.array, k: float = 1) -> np.array:
+def numpy_color2sepia(image: np.array, k: float = 1, out: np.array = None, scratch: np.array = None) -> np.array:
     """Convert rgb pixel array to sepia
 
     Args:
         image (np.array)
         k (float): amount of sepia (optional)
+        out (np.array): array to write the result to (optional)
+        scratch (np.array): float64 work array of the same shape as image (optional)
 
     The amount of sepia is given as a fraction, k=0 yields no sepia while
     k=1 yields full sepia.
 
+    Passing the same out and scratch arrays to every call avoids
+    allocating any image-sized memory, e.g. when filtering video frames.
+
     Returns:
         np.array: sepia_image
     """
@@ -41,8 +65,10 @@ def numpy_color2sepia(image: np.array, k: float = 1) -> np.array:
         # validate k
         raise ValueError(f"k must be between [0-1], got {k=}")
 
+    image = np.asarray(image)
     # Initialize sepia_image
-    sepia_image = np.empty_like(image, dtype=np.uint8)
+    sepia_image = _output_array(out, image.shape)
+    scratch = _output_array(scratch, image.shape, dtype=np.float64)
 
     # Define sepia matrix
     base_matrix = np.array([
@@ -56,15 +82,192 @@ def numpy_color2sepia(image: np.array, k: float = 1) -> np.array:
     sepia_matrix = k * base_matrix + (1 - k) * np.identity(3)
 
     # Apply the matrix filter using Einstein summation for matrix multiplication
-    sepia_image = np.einsum('...i,ij->...j', image, sepia_matrix.T) # Transposing the matrix
+    np.einsum('...i,ij->...j', image, sepia_matrix.T, out=scratch) # Transposing the matrix
     
     # Clip the values between 0 and 255
-    sepia_image = np.clip(sepia_image, 0, 255).astype(np.uint8)
+    np.clip(scratch, 0, 255, out=scratch)
+    np.copyto(sepia_image, scratch, casting="unsafe")
 
     # Return the sepia_image
     return sepia_image
 
 
+def _along(axis: int, start: int, stop: int) -> tuple:
+    """Index selecting start:stop along axis"""
+    return (slice(None),) * axis + (slice(start, stop),)
+
+
+def _numpy_convolve(image: np.array, kernel: np.array) -> np.array:
+    """Convolve the rows, then the columns, of image with a 1D kernel
+
+    Args:
+        image (np.array): (height, width, channels) image
+        kernel (np.array): 1D kernel of odd size
+    Returns:
+        np.array: the float64 result
+    """
+    radius = len(kernel) // 2
+    result = image
+    for axis in (1, 0):
+        padding = [(0, 0)] * image.ndim
+        padding[axis] = (radius, radius)
+        padded = np.pad(result, padding, mode="edge")
+        n = image.shape[axis]
+        result = np.zeros(image.shape)
+        term = np.empty(image.shape)
+        # one vectorized multiply-add per kernel weight
+        for i, weight in enumerate(kernel):
+            np.multiply(padded[_along(axis, i, i + n)], weight, out=term)
+            result += term
+    return result
+
+
+def _numpy_finish(image: np.array, blurred: np.array, weight: float, out: np.array) -> np.array:
+    """Write blurred + weight * (image - blurred), rounded and clipped, to out
+
+    weight 0 is the blur itself, and weight 1 + amount sharpens by amount.
+    """
+    if weight:
+        blurred += weight * (image - blurred)
+    np.rint(blurred, out=blurred)
+    np.clip(blurred, 0, 255, out=blurred)
+    np.copyto(out, blurred.reshape(out.shape), casting="unsafe")
+    return out
+
+
+def numpy_blur(image: np.array, radius: int = 2, sigma: float | None = None, out: np.array = None) -> np.array:
+    """Gaussian blur, with separable row and column passes
+
+    Args:
+        image (np.array): gray or rgb image
+        radius (int): the kernel radius in pixels (optional)
+        sigma (float): the standard deviation of the gaussian (optional, default: radius / 2)
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: blurred_image
+    """
+    image = np.asarray(image)
+    blurred_image = _output_array(out, image.shape)
+    blurred = _numpy_convolve(as_channels(image), gaussian_kernel(radius, sigma))
+    return _numpy_finish(as_channels(image), blurred, 0, blurred_image)
+
+
+def numpy_sharpen(image: np.array, radius: int = 1, amount: float = 1, out: np.array = None) -> np.array:
+    """Sharpen with an unsharp mask: image + amount * (image - blurred image)
+
+    Args:
+        image (np.array): gray or rgb image
+        radius (int): the radius of the gaussian blur in pixels (optional)
+        amount (float): how much to sharpen (optional)
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: sharpened_image
+    """
+    image = np.asarray(image)
+    sharpened_image = _output_array(out, image.shape)
+    blurred = _numpy_convolve(as_channels(image), gaussian_kernel(radius))
+    return _numpy_finish(as_channels(image), blurred, 1 + amount, sharpened_image)
+
+
+def numpy_box_blur(image: np.array, radius: int = 2, out: np.array = None) -> np.array:
+    """Box blur: the mean of the (2 * radius + 1)² neighborhood, from running sums
+
+    The sums are differences of cumulative sums, so the cost does not depend on the radius.
+
+    Args:
+        image (np.array): gray or rgb image
+        radius (int): the box radius in pixels (optional)
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: blurred_image
+    """
+    check_radius(radius)
+    image = np.asarray(image)
+    blurred_image = _output_array(out, image.shape)
+    size = 2 * radius + 1
+    sums = as_channels(image)
+    for axis in (1, 0):
+        padding = [(0, 0)] * sums.ndim
+        padding[axis] = (radius + 1, radius)
+        # exact integer sums, with a leading zero before the cumulative sum
+        cumulative = np.pad(sums, padding, mode="edge").astype(np.int64)
+        cumulative[_along(axis, 0, 1)] = 0
+        np.cumsum(cumulative, axis=axis, out=cumulative)
+        n = sums.shape[axis]
+        sums = cumulative[_along(axis, size, size + n)] - cumulative[_along(axis, 0, n)]
+    # rounded mean
+    area = size * size
+    np.copyto(blurred_image, ((sums + area // 2) // area).reshape(image.shape), casting="unsafe")
+    return blurred_image
+
+
+def _numpy_histograms(image: np.array, bands: list) -> np.array:
+    """Count the values of each channel of a (height, width, channels) image, one band of rows at a time
+
+    Returns:
+        np.array: (channels, 256) counts
+    """
+    channels = image.shape[2]
+    # one bincount per band, with the values of channel c counted in bins 256 * c to 256 * c + 255
+    offsets = np.arange(channels) * 256
+    histograms = np.zeros(channels * 256, dtype=np.int64)
+    for band in bands:
+        histograms += np.bincount((image[band] + offsets).ravel(), minlength=channels * 256)
+    return histograms.reshape(channels, 256)
+
+
+def _numpy_remap(image: np.array, tables: np.array, out: np.array, bands: list) -> None:
+    """out[..., c] = tables[c][image[..., c]], one band of rows at a time"""
+    for band in bands:
+        for channel, table in enumerate(tables):
+            # mode="clip" avoids buffering, uint8 indices are always in range
+            np.take(table, image[band, :, channel], out=out[band, :, channel], mode="clip")
+
+
+def _numpy_tone(image: np.array, make_tables, out: np.array, band_rows: int | None) -> np.array:
+    """Count the histograms of image, and remap it through make_tables(histograms) into out"""
+    from .numpy_tiled_filters import _band_slices
+
+    image = np.asarray(image)
+    toned_image = _output_array(out, image.shape)
+    channel_image = as_channels(image)
+    bands = _band_slices(image.shape[0], image[:1].nbytes, 1, band_rows)
+    tables = make_tables(_numpy_histograms(channel_image, bands))
+    _numpy_remap(channel_image, tables, as_channels(toned_image), bands)
+    return toned_image
+
+
+def numpy_equalize(image: np.array, out: np.array = None, band_rows: int | None = None) -> np.array:
+    """Equalize the histogram of each channel, spreading its values evenly over 0-255
+
+    The histograms are counted with np.bincount, and the image is remapped
+    through a 256-entry table per channel, one band of rows at a time,
+    so only band-sized temporary arrays are needed.
+
+    Args:
+        image (np.array): gray or rgb image
+        out (np.array): array to write the result to (optional)
+        band_rows (int): number of rows per band (optional)
+    Returns:
+        np.array: equalized_image
+    """
+    return _numpy_tone(image, equalize_tables, out, band_rows)
+
+
+def numpy_autolevels(image: np.array, cutoff: float = 0, out: np.array = None, band_rows: int | None = None) -> np.array:
+    """Stretch the values of each channel to the full 0-255 range
+
+    Args:
+        image (np.array): gray or rgb image
+        cutoff (float): percent of the darkest and brightest values to ignore (optional)
+        out (np.array): array to write the result to (optional)
+        band_rows (int): number of rows per band (optional)
+    Returns:
+        np.array: leveled_image
+    """
+    return _numpy_tone(image, lambda histograms: autolevels_tables(histograms, cutoff), out, band_rows)
+
+
 '''
 Made for testing during developing:::
 
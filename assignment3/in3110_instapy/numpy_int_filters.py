@@ -0,0 +1,87 @@
+"""fixed-point integer numpy implementation of image filters
+
+The filter weights are scaled by a power of two and rounded to integers,
+so each pixel is computed with integer multiply-adds, a shift, and a clamp.
+The accumulators are uint16 (gray) and uint32 (sepia) instead of float32/float64,
+which moves much less memory than the float implementation.
+Results are within one level of the pure Python reference.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+from . import _output_array
+
+# gray: weights scaled by 2**8 sum to exactly 256, so 255 * 256 fits in uint16
+GRAY_SHIFT = 8
+GRAY_WEIGHTS = np.round(np.array([0.21, 0.72, 0.07]) * (1 << GRAY_SHIFT)).astype(np.uint16)
+
+# sepia: rows of the matrix sum to up to 1.351, so accumulate in uint32
+SEPIA_SHIFT = 10
+SEPIA_MATRIX = np.array([
+    [0.393, 0.769, 0.189],
+    [0.349, 0.686, 0.168],
+    [0.272, 0.534, 0.131]
+])
+
+
+def _weighted_sum(image: np.array, weights: np.array, shift: int, out: np.array, acc: np.array, term: np.array) -> None:
+    """out = min((image @ weights) >> shift, 255), using acc and term as work arrays"""
+    np.multiply(image[:, :, 0], weights[0], out=acc)
+    for channel in (1, 2):
+        np.multiply(image[:, :, channel], weights[channel], out=term)
+        acc += term
+    acc >>= shift
+    # saturate at 255 before narrowing to uint8
+    np.minimum(acc, 255, out=acc)
+    np.copyto(out, acc, casting="unsafe")
+
+
+def numpy_int_color2gray(image: np.array, out: np.array = None, scratch: np.array = None) -> np.array:
+    """Convert rgb pixel array to grayscale with integer arithmetic
+
+    Args:
+        image (np.array)
+        out (np.array): array to write the result to (optional)
+        scratch (np.array): uint16 work array of shape (2, height, width) (optional)
+    Returns:
+        np.array: gray_image
+    """
+    image = np.asarray(image)
+    rows, cols = image.shape[:2]
+    gray_image = _output_array(out, (rows, cols))
+    acc, term = _output_array(scratch, (2, rows, cols), dtype=np.uint16)
+
+    _weighted_sum(image, GRAY_WEIGHTS, GRAY_SHIFT, gray_image, acc, term)
+    return gray_image
+
+
+def numpy_int_color2sepia(image: np.array, k: float = 1, out: np.array = None, scratch: np.array = None) -> np.array:
+    """Convert rgb pixel array to sepia with integer arithmetic
+
+    Args:
+        image (np.array)
+        k (float): amount of sepia (optional)
+        out (np.array): array to write the result to (optional)
+        scratch (np.array): uint32 work array of shape (2, height, width) (optional)
+
+    The amount of sepia is given as a fraction, k=0 yields no sepia while
+    k=1 yields full sepia.
+
+    Returns:
+        np.array: sepia_image
+    """
+    if not 0 <= k <= 1:
+        # validate k
+        raise ValueError(f"k must be between [0-1], got {k=}")
+
+    image = np.asarray(image)
+    rows, cols = image.shape[:2]
+    sepia_image = _output_array(out, image.shape)
+    acc, term = _output_array(scratch, (2, rows, cols), dtype=np.uint32)
+
+    sepia_matrix = k * SEPIA_MATRIX + (1 - k) * np.identity(3)
+    weights = np.round(sepia_matrix * (1 << SEPIA_SHIFT)).astype(np.uint32)
+    for channel in range(3):
+        _weighted_sum(image, weights[channel], SEPIA_SHIFT, sepia_image[:, :, channel], acc, term)
+    return sepia_image
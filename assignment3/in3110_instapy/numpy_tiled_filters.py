@@ -0,0 +1,102 @@
+"""tiled, multi-threaded numpy implementation of image filters
+
+The image is split into bands of rows, and each band is filtered
+by the numpy implementation on a thread pool.
+numpy releases the GIL inside its ufuncs, so the bands run in parallel,
+and the temporary float arrays only ever have the size of one band.
+"""
+from __future__ import annotations
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from . import _output_array
+from .numpy_filters import numpy_color2gray, numpy_color2sepia
+
+# target size (in bytes of input pixels) of one band
+BAND_BYTES = 1 << 20
+
+
+def _band_slices(rows: int, row_bytes: int, workers: int, band_rows: int | None = None):
+    """Split `rows` into slices of rows, one per band
+
+    Args:
+        rows (int): number of rows in the image
+        row_bytes (int): size of one input row in bytes
+        workers (int): number of worker threads
+        band_rows (int): number of rows per band (optional)
+    Returns:
+        list of slice: the row ranges of each band
+    """
+    if band_rows is None:
+        band_rows = max(1, BAND_BYTES // max(row_bytes, 1))
+        # make sure every worker gets at least one band
+        band_rows = min(band_rows, -(-rows // workers))
+    if band_rows < 1:
+        raise ValueError(f"band_rows must be positive, got {band_rows=}")
+    return [slice(start, min(start + band_rows, rows)) for start in range(0, rows, band_rows)]
+
+
+def _run_bands(band_filter, image: np.array, out: np.array, workers: int | None, band_rows: int | None) -> np.array:
+    """Apply band_filter(image_band, out_band) to each band of image, writing the result into out"""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"workers must be positive, got {workers=}")
+
+    bands = _band_slices(image.shape[0], image[:1].nbytes, workers, band_rows)
+
+    def filter_band(band):
+        band_filter(image[band], out[band])
+
+    if workers == 1 or len(bands) == 1:
+        for band in bands:
+            filter_band(band)
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            # consume the iterator to propagate any exceptions
+            list(pool.map(filter_band, bands))
+    return out
+
+
+def numpy_tiled_color2gray(
+    image: np.array, workers: int | None = None, band_rows: int | None = None, out: np.array = None
+) -> np.array:
+    """Convert rgb pixel array to grayscale, one band of rows per task
+
+    Args:
+        image (np.array)
+        workers (int): number of threads (optional, default: one per cpu)
+        band_rows (int): number of rows per band (optional)
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: gray_image
+    """
+    image = np.asarray(image)
+    gray_image = _output_array(out, image.shape[:2])
+    return _run_bands(lambda band, out: numpy_color2gray(band, out=out), image, gray_image, workers, band_rows)
+
+
+def numpy_tiled_color2sepia(
+    image: np.array, k: float = 1, workers: int | None = None, band_rows: int | None = None, out: np.array = None
+) -> np.array:
+    """Convert rgb pixel array to sepia, one band of rows per task
+
+    Args:
+        image (np.array)
+        k (float): amount of sepia (optional)
+        workers (int): number of threads (optional, default: one per cpu)
+        band_rows (int): number of rows per band (optional)
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: sepia_image
+    """
+    if not 0 <= k <= 1:
+        # validate k
+        raise ValueError(f"k must be between [0-1], got {k=}")
+
+    image = np.asarray(image)
+    sepia_image = _output_array(out, image.shape)
+    return _run_bands(lambda band, out: numpy_color2sepia(band, k=k, out=out), image, sepia_image, workers, band_rows)
@@ -5,15 +5,26 @@ from __future__ import annotations
 
 import cProfile
 import pstats
+import sys
 
 import in3110_instapy
 import line_profiler
 
 from . import io
+from .timing import format_stages
 
 
-def profile_with_cprofile(filter, image, ncalls=3):
-    """Profile filter(image) with line_profiler
+def _line_profiled_function(function):
+    """The python function line_profiler should measure for `function`
+
+    numba functions are measured through their python source (`py_func`),
+    though the compiled code that actually runs has no line information.
+    """
+    return getattr(function, "py_func", function)
+
+
+def profile_with_cprofile(filter, image, ncalls=3, stream=None):
+    """Profile filter(image) with cProfile
 
     Statistics will be printed to stdout.
 
@@ -22,17 +33,19 @@ def profile_with_cprofile(filter, image, ncalls=3):
         filter (callable): filter function
         image (ndarray): image to filter
         ncalls (int): number of repetitions to measure
+        stream (file): where to print the statistics (optional, default: stdout)
     """
     profiler = cProfile.Profile()
     # run `filter(image)` in the profiler
-    ...
-    stats = pstats.Stats(profiler)
+    for _ in range(ncalls):
+        profiler.runcall(filter, image)
+    stats = pstats.Stats(profiler, stream=stream or sys.stdout)
     # print the top 10 results, sorted by cumulative time
     # (check sort_stats and print_stats docstrings)
-    ...
+    stats.sort_stats("cumulative").print_stats(10)
 
 
-def profile_with_line_profiler(filter, image, ncalls=3):
+def profile_with_line_profiler(filter, image, ncalls=3, stream=None):
     """Profile filter(image) with line_profiler
 
     Statistics will be printed to stdout.
@@ -42,15 +55,17 @@ def profile_with_line_profiler(filter, image, ncalls=3):
         filter (callable): filter function
         image (ndarray): image to filter
         ncalls (int): number of repetitions to measure
+        stream (file): where to print the statistics (optional, default: stdout)
     """
     # create the LineProfiler
     profiler = line_profiler.LineProfiler()
     # tell it to measure the function we are given
-    profiler.add_function(filter)
+    profiler.add_function(_line_profiled_function(filter))
     # Measure filter(image)
-    ...
+    for _ in range(ncalls):
+        profiler.runcall(filter, image)
     # print statistics
-    ...
+    profiler.print_stats(stream=stream or sys.stdout, stripzeros=True)
 
 
 def run_profiles(profiler: str = "cprofile"):
@@ -62,26 +77,75 @@ def run_profiles(profiler: str = "cprofile"):
     """
     # Select which profile function to use
     if profiler == "line_profiler":
-        profile_func = ...
+        profile_func = profile_with_line_profiler
     elif profiler.lower() == "cprofile":
-        profile_func = ...
+        profile_func = profile_with_cprofile
     else:
         raise ValueError(f"{profiler=} must be 'line_profiler' or 'cprofile'")
 
     # construct a random 640x480 image
-    image = ...
+    image = io.random_image(640, 480)
 
-    filter_names = ...
-    implementations = ...
+    filter_names = ["color2gray", "color2sepia"]
+    # auto only dispatches to the other implementations
+    implementations = [name for name in in3110_instapy.available_implementations() if name != "auto"]
     for filter_name in filter_names:
         for implementation in implementations:
+            try:
+                filter = in3110_instapy.get_filter(filter_name, implementation)  #
+            except (ImportError, AttributeError) as e:
+                # e.g. cython, when the package was built without it
+                print(f"Skipping {implementation} {filter_name}: {e}")
+                continue
             print(f"Profiling {implementation} {filter_name} with {profiler}:")
-            filter = in3110_instapy.get_filter(filter_name, implementation)  #
             # call it once
             filter(image)
             profile_func(filter, image)
 
 
+def profile_run(profiler: str, profile_file: str, file: str, **kwargs) -> dict:
+    """Profile a whole command-line run, from decoding to encoding
+
+    The time of each stage (decode, resize, filter, encode) is printed,
+    and written with the sorted profile statistics to profile_file.
+
+    Args:
+
+        profiler (str): either 'cprofile' or 'line'
+        profile_file (str): the file to write the statistics to
+        file (str): the image file to filter
+        **kwargs: other arguments for cli.run_filter
+    Returns:
+        dict: seconds spent in each stage
+    """
+    from .cli import run_filter
+
+    timings = {}
+    if profiler == "cprofile":
+        profile = cProfile.Profile()
+        profile.runcall(run_filter, file, timings=timings, **kwargs)
+    elif profiler == "line":
+        profile = line_profiler.LineProfiler()
+        profile.add_function(run_filter)
+        if kwargs.get("pipeline") is None:
+            filter_function = in3110_instapy.get_filter(kwargs.get("filter", "color2gray"), kwargs.get("implementation", "python"))
+            profile.add_function(_line_profiled_function(filter_function))
+        profile.runcall(run_filter, file, timings=timings, **kwargs)
+    else:
+        raise ValueError(f"{profiler=} must be 'cprofile' or 'line'")
+
+    stages = format_stages(timings)
+    print(stages)
+    with open(profile_file, "w") as f:
+        f.write(f"Stage timings:\n{stages}\n\n")
+        if profiler == "cprofile":
+            pstats.Stats(profile, stream=f).sort_stats("cumulative").print_stats()
+        else:
+            profile.print_stats(stream=f, stripzeros=True)
+    print(f"Profile statistics written to {profile_file}")
+    return timings
+
+
 if __name__ == "__main__":
     print("Begin cProfile")
     run_profiles("cprofile")
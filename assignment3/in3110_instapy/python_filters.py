@@ -3,11 +3,15 @@ from __future__ import annotations
 from PIL import Image
 import numpy as np
 
-def python_color2gray(image: np.array) -> np.array:
+from . import _output_array
+from .kernels import as_channels, check_radius, gaussian_kernel
+
+def python_color2gray(image: np.array, out: np.array = None) -> np.array:
     """Convert rgb pixel array to grayscale
 
     Args:
         image (np.array)
+        out (np.array): array to write the result to (optional)
     Returns:
         np.array: gray_image
     """
@@ -16,7 +20,7 @@ def python_color2gray(image: np.array) -> np.array:
     
     # iterate through the pixels, and apply the grayscale transform
     rows, cols, _ = image_np.shape
-    gray_image = np.empty((rows, cols), dtype=np.uint8)
+    gray_image = _output_array(out, (rows, cols))
 
     for i in range(rows):
         for j in range(cols):
@@ -26,18 +30,19 @@ def python_color2gray(image: np.array) -> np.array:
 
     return gray_image
 
-def python_color2sepia(image: np.array) -> np.array:
+def python_color2sepia(image: np.array, out: np.array = None) -> np.array:
     """Convert rgb pixel array to sepia
 
     Args:
         image (np.array)
+        out (np.array): array to write the result to (optional)
     Returns:
         np.array: sepia_image
     """
     if isinstance(image, Image.Image):
-        image = np.array(image)
+        image = np.asarray(image)
     
-    sepia_image = np.empty_like(image)
+    sepia_image = _output_array(out, image.shape)
     height, width, _ = image.shape
 
     for y in range(height):
@@ -49,6 +54,132 @@ def python_color2sepia(image: np.array) -> np.array:
             sepia_image[y, x] = [min(255, tr), min(255, tg), min(255, tb)]
 
     return sepia_image
+
+
+def _python_convolve(image: np.array, kernel: list) -> list:
+    """Convolve the rows, then the columns, of a (height, width, channels) image with a 1D kernel
+
+    Returns:
+        list: the result as nested [y][x][channel] lists of floats
+    """
+    height, width, channels = image.shape
+    radius = len(kernel) // 2
+    pixels = image.tolist()
+
+    rows = []
+    for y in range(height):
+        row = []
+        for x in range(width):
+            # repeat the edge pixels outside the image
+            neighbors = [pixels[y][min(max(x + i - radius, 0), width - 1)] for i in range(len(kernel))]
+            row.append([sum(weight * pixel[c] for weight, pixel in zip(kernel, neighbors)) for c in range(channels)])
+        rows.append(row)
+
+    result = []
+    for y in range(height):
+        row = []
+        for x in range(width):
+            neighbors = [rows[min(max(y + i - radius, 0), height - 1)][x] for i in range(len(kernel))]
+            row.append([sum(weight * pixel[c] for weight, pixel in zip(kernel, neighbors)) for c in range(channels)])
+        result.append(row)
+    return result
+
+
+def _python_finish(image: np.array, blurred: list, weight: float, out: np.array) -> np.array:
+    """Write blurred + weight * (image - blurred), rounded and clipped, to out
+
+    weight 0 is the blur itself, and weight 1 + amount sharpens by amount.
+    """
+    height, width, channels = image.shape
+    out_pixels = as_channels(out)
+    for y in range(height):
+        for x in range(width):
+            for c in range(channels):
+                value = blurred[y][x][c]
+                if weight:
+                    value += weight * (int(image[y, x, c]) - value)
+                out_pixels[y, x, c] = min(255, max(0, round(value)))
+    return out
+
+
+def python_blur(image: np.array, radius: int = 2, sigma: float | None = None, out: np.array = None) -> np.array:
+    """Gaussian blur, with separable row and column passes
+
+    Args:
+        image (np.array): gray or rgb image
+        radius (int): the kernel radius in pixels (optional)
+        sigma (float): the standard deviation of the gaussian (optional, default: radius / 2)
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: blurred_image
+    """
+    image = np.asarray(image)
+    blurred_image = _output_array(out, image.shape)
+    kernel = gaussian_kernel(radius, sigma).tolist()
+    blurred = _python_convolve(as_channels(image), kernel)
+    return _python_finish(as_channels(image), blurred, 0, blurred_image)
+
+
+def python_sharpen(image: np.array, radius: int = 1, amount: float = 1, out: np.array = None) -> np.array:
+    """Sharpen with an unsharp mask: image + amount * (image - blurred image)
+
+    Args:
+        image (np.array): gray or rgb image
+        radius (int): the radius of the gaussian blur in pixels (optional)
+        amount (float): how much to sharpen (optional)
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: sharpened_image
+    """
+    image = np.asarray(image)
+    sharpened_image = _output_array(out, image.shape)
+    blurred = _python_convolve(as_channels(image), gaussian_kernel(radius).tolist())
+    return _python_finish(as_channels(image), blurred, 1 + amount, sharpened_image)
+
+
+def _python_running_sums(line: list, radius: int) -> list:
+    """The sums of the 2 * radius + 1 values around each position of a line of [channel] values"""
+    n = len(line)
+    channels = len(line[0])
+    # the window around position 0, with the edge repeated
+    window = [sum(line[min(max(i, 0), n - 1)][c] for i in range(-radius, radius + 1)) for c in range(channels)]
+    sums = []
+    for x in range(n):
+        sums.append(list(window))
+        # slide the window one position: add the value entering it, subtract the one leaving
+        entering = line[min(x + radius + 1, n - 1)]
+        leaving = line[max(x - radius, 0)]
+        window = [window[c] + entering[c] - leaving[c] for c in range(channels)]
+    return sums
+
+
+def python_box_blur(image: np.array, radius: int = 2, out: np.array = None) -> np.array:
+    """Box blur: the mean of the (2 * radius + 1)² neighborhood, from running sums
+
+    The cost of the running sums does not depend on the radius.
+
+    Args:
+        image (np.array): gray or rgb image
+        radius (int): the box radius in pixels (optional)
+        out (np.array): array to write the result to (optional)
+    Returns:
+        np.array: blurred_image
+    """
+    check_radius(radius)
+    image = np.asarray(image)
+    blurred_image = _output_array(out, image.shape)
+    height, width, channels = as_channels(image).shape
+    area = (2 * radius + 1) ** 2
+
+    row_sums = [_python_running_sums(row, radius) for row in as_channels(image).tolist()]
+    out_pixels = as_channels(blurred_image)
+    for x in range(width):
+        column = [row_sums[y][x] for y in range(height)]
+        for y, sums in enumerate(_python_running_sums(column, radius)):
+            for c in range(channels):
+                # rounded mean
+                out_pixels[y, x, c] = (sums[c] + area // 2) // area
+    return blurred_image
 '''
 Made for testing during eveloping::::
 
@@ -0,0 +1,254 @@
+"""HTTP service: filter uploaded images with a warm pool of worker processes
+
+Starting a process per image pays for starting Python and importing
+(and compiling) the backends every time. The service starts a pool of
+worker processes once, runs every requested backend in them before taking
+requests (so e.g. numba has compiled its filters), and sends each upload to the pool.
+
+Run as:
+
+    python3 -m in3110_instapy serve --port 8000 --jobs 4 --warm numpy numba
+
+and filter an image by posting it to /filter, with the parameters in the query string:
+
+    curl --data-binary @rain.jpg 'localhost:8000/filter?filter=color2sepia&implementation=numba&scale=0.5' -o out.jpg
+
+Parameters are `filter` (default: color2gray), `implementation` (default: numpy),
+`scale` (default: 1) and `format` (e.g. png or jpeg, default: the format of the upload).
+Uploads larger than `--max-body` (default: 64M) are refused with 413.
+
+GET /metrics reports the request counts and latency, and the queue depth,
+in the Prometheus text format.
+"""
+from __future__ import annotations
+
+import argparse
+import collections
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+from PIL import Image, UnidentifiedImageError
+
+from . import available_implementations, get_filter, io
+
+# number of recent requests the latency quantiles are computed from
+LATENCY_WINDOW = 1000
+WARM_FILTERS = ["color2gray", "color2sepia"]
+# default size limit of an upload, in bytes
+MAX_BODY = 64 * 1024**2
+
+
+def _warm_up(implementations: list) -> None:
+    """Pool initializer: run every filter of the implementations once, so they are loaded and compiled"""
+    for implementation in implementations:
+        for filter in WARM_FILTERS:
+            try:
+                get_filter(filter, implementation)(io.random_image(8, 8))
+            except (ImportError, AttributeError):
+                # e.g. cython, when the package was built without it
+                pass
+
+
+def filter_bytes(data: bytes, filter: str = "color2gray", implementation: str = "numpy", scale: float = 1, format: str | None = None) -> tuple:
+    """Decode, filter and encode an image in memory
+
+    Args:
+        data (bytes): the encoded image
+        filter (str): the filter name
+        implementation (str): the filter implementation
+        scale (float): scale factor to resize the image
+        format (str): the output format or extension, e.g. 'png' or 'jpg' (optional, default: the format of the input)
+    Returns:
+        (bytes, str): the encoded result, and its format
+    Raises:
+        ValueError: if the image can't be decoded, or the format is unknown
+    """
+    filter_function = get_filter(filter, implementation)
+    if format is not None:
+        # the same names as --format, e.g. jpg or jpeg
+        format = io.format_name(format)
+    try:
+        format = format or Image.open(BytesIO(data)).format or "PNG"
+        image = io.read_image(BytesIO(data), scale=scale)
+    except OSError as e:
+        # unknown formats (UnidentifiedImageError) and broken images,
+        # the data is in memory, so these are never i/o failures
+        raise ValueError(f"Can't decode the image: {e}") from e
+    return io.encode_image(filter_function(image), format), format
+
+
+class FilterServer(ThreadingHTTPServer):
+    """HTTP server sending the images to a pool of worker processes
+
+    Each request is handled in a thread, which waits for a worker.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple, jobs: int | None = None, warm: list | None = None, max_body: int = MAX_BODY):
+        from .batch import pool_context
+
+        super().__init__(address, _Handler)
+        if warm is None:
+            warm = ["numpy"]
+        self.jobs = jobs or os.cpu_count() or 1
+        self.max_body = max_body
+        self.pool = pool_context().Pool(self.jobs, initializer=_warm_up, initargs=(warm,))
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.requests = collections.Counter()
+        self.latency_sum = 0.0
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+
+    def filter(self, data: bytes, **params) -> tuple:
+        """Filter an image on the pool, keeping track of the requests waiting for it"""
+        with self.lock:
+            self.in_flight += 1
+        try:
+            return self.pool.apply(filter_bytes, (data,), params)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+
+    def record(self, status: int, seconds: float) -> None:
+        """Count a finished request"""
+        with self.lock:
+            self.requests[status] += 1
+            self.latency_sum += seconds
+            self.latencies.append(seconds)
+
+    def metrics(self) -> str:
+        """The request counts, latency and queue depth, in the Prometheus text format"""
+        with self.lock:
+            requests = dict(self.requests)
+            latency_sum = self.latency_sum
+            latencies = list(self.latencies)
+            in_flight = self.in_flight
+        lines = [
+            "# TYPE instapy_requests_total counter",
+            *(f'instapy_requests_total{{status="{status}"}} {count}' for status, count in sorted(requests.items())),
+            "# TYPE instapy_request_latency_seconds summary",
+        ]
+        if latencies:
+            for quantile, value in zip((0.5, 0.9, 0.99), np.quantile(latencies, [0.5, 0.9, 0.99])):
+                lines.append(f'instapy_request_latency_seconds{{quantile="{quantile}"}} {value:.6f}')
+        lines += [
+            f"instapy_request_latency_seconds_sum {latency_sum:.6f}",
+            f"instapy_request_latency_seconds_count {sum(requests.values())}",
+            "# TYPE instapy_in_flight gauge",
+            f"instapy_in_flight {in_flight}",
+            "# TYPE instapy_queue_depth gauge",
+            f"instapy_queue_depth {max(0, in_flight - self.jobs)}",
+            "# TYPE instapy_workers gauge",
+            f"instapy_workers {self.jobs}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def server_close(self):
+        super().server_close()
+        self.pool.terminate()
+        self.pool.join()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Handles /filter and /metrics"""
+
+    def do_GET(self):
+        if urlparse(self.path).path != "/metrics":
+            self._reply(404, b"Not found\n")
+            return
+        self._reply(200, self.server.metrics().encode(), "text/plain; version=0.0.4")
+
+    def do_POST(self):
+        start = time.perf_counter()
+        url = urlparse(self.path)
+        if url.path != "/filter":
+            self._reply(404, b"Not found\n")
+            return
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if not 0 <= length <= self.server.max_body:
+            # the body is not read, so the connection can't be reused
+            self.close_connection = True
+            status = 400 if length < 0 else 413
+            message = "Invalid Content-Length" if length < 0 else f"Upload larger than {self.server.max_body} bytes"
+            self._reply(status, f"{message}\n".encode())
+            self.server.record(status, time.perf_counter() - start)
+            return
+        try:
+            data = self.rfile.read(length)
+            params = {
+                "filter": query.get("filter", "color2gray"),
+                "implementation": query.get("implementation", "numpy"),
+                "scale": float(query.get("scale", 1)),
+                "format": query.get("format"),
+            }
+            if params["implementation"] not in available_implementations():
+                raise ValueError(f"Unknown implementation {params['implementation']!r}")
+            if not 0 < params["scale"] <= 1:
+                raise ValueError(f"scale must be in (0, 1], got {params['scale']}")
+            result, format = self.server.filter(data, **params)
+        except (ValueError, KeyError, AttributeError, UnidentifiedImageError) as e:
+            # bad parameters, unknown filters or formats, and broken images (see filter_bytes)
+            status = 400
+            self._reply(status, f"{type(e).__name__}: {e}\n".encode())
+        except Exception as e:
+            status = 500
+            self._reply(status, f"{type(e).__name__}: {e}\n".encode())
+        else:
+            status = 200
+            self._reply(status, result, Image.MIME.get(format, "application/octet-stream"))
+        self.server.record(status, time.perf_counter() - start)
+
+    def _reply(self, status: int, body: bytes, content_type: str = "text/plain") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        # write in chunks, so large results are streamed to the client
+        view = memoryview(body)
+        for start in range(0, len(view), 1 << 16):
+            self.wfile.write(view[start : start + (1 << 16)])
+
+    def log_message(self, format, *args):
+        # no log line per request
+        pass
+
+
+def main(argv=None) -> None:
+    """Run the service from the command-line (`python3 -m in3110_instapy serve`)"""
+    parser = argparse.ArgumentParser(prog="in3110_instapy serve", description="Filter uploaded images over HTTP")
+    parser.add_argument("--host", help="The address to listen on (default: localhost)", default="localhost")
+    parser.add_argument("--port", type=int, help="The port to listen on (default: 8000)", default=8000)
+    parser.add_argument("--jobs", type=int, help="Number of worker processes (default: one per cpu)", default=None)
+    parser.add_argument(
+        "--warm", nargs="+", help="Implementations to load and compile before taking requests (default: numpy)", default=["numpy"]
+    )
+    parser.add_argument("--max-body", help="Size limit of an upload, e.g. 16M (default: 64M)", default=None)
+    args = parser.parse_args(argv)
+
+    max_body = MAX_BODY
+    if args.max_body is not None:
+        from .strips import parse_size
+
+        try:
+            max_body = parse_size(args.max_body)
+        except ValueError as e:
+            parser.error(str(e))
+
+    server = FilterServer((args.host, args.port), jobs=args.jobs, warm=args.warm, max_body=max_body)
+    print(f"Serving on http://{args.host}:{server.server_address[1]} with {server.jobs} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
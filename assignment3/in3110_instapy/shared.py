@@ -0,0 +1,139 @@
+"""Multi-process filtering with the images in shared memory
+
+The pure Python filters can only use one core because of the GIL,
+and sending large arrays to worker processes costs more than it saves.
+Here, the input and output images are put in `multiprocessing.shared_memory`
+blocks, and each worker filters a range of rows in place:
+only the block names and row ranges are sent to the workers.
+
+Any implementation from `get_filter` can be wrapped:
+
+    filter_function = shared_memory_filter("color2sepia", "python", workers=8)
+    sepia_image = filter_function(image)
+
+The worker pools are started on first use, and kept until the process exits
+(or close_pools is called).
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from . import _output_array, get_filter
+from .numpy_tiled_filters import _band_slices
+
+# worker pools, by (filter, implementation, workers)
+_pools = {}
+# the filter function of a worker process
+_worker_filter = None
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to a shared memory block created by the parent process"""
+    if sys.version_info >= (3, 13):
+        # the parent owns the block, and unlinks it
+        return shared_memory.SharedMemory(name, track=False)
+    return shared_memory.SharedMemory(name)
+
+
+def _init_worker(filter: str, implementation: str) -> None:
+    """Pool initializer: load the filter, and run it once so e.g. numba compiles"""
+    global _worker_filter
+    _worker_filter = get_filter(filter, implementation)
+    _worker_filter(np.zeros((2, 2, 3), dtype=np.uint8))
+
+
+def _filter_rows(task: tuple) -> None:
+    """Filter a range of rows of the shared input image into the shared output image"""
+    in_name, out_name, shape, out_shape, start, stop = task
+    in_block = _attach(in_name)
+    out_block = _attach(out_name)
+    try:
+        image = np.ndarray(shape, dtype=np.uint8, buffer=in_block.buf)
+        out = np.ndarray(out_shape, dtype=np.uint8, buffer=out_block.buf)
+        _worker_filter(image[start:stop], out=out[start:stop])
+        # release the views before closing the blocks
+        del image, out
+    finally:
+        in_block.close()
+        out_block.close()
+
+
+def _get_pool(filter: str, implementation: str, workers: int):
+    """The worker pool for a filter, started on first use"""
+    from .batch import pool_context
+
+    key = (filter, implementation, workers)
+    if key not in _pools:
+        _pools[key] = pool_context().Pool(workers, initializer=_init_worker, initargs=(filter, implementation))
+    return _pools[key]
+
+
+def close_pools() -> None:
+    """Stop all worker pools"""
+    while _pools:
+        _, pool = _pools.popitem()
+        pool.terminate()
+        pool.join()
+
+
+atexit.register(close_pools)
+
+
+def shared_memory_filter(filter: str = "color2gray", implementation: str = "python", workers: int | None = None):
+    """Return a filter function that runs an implementation on a pool of processes
+
+    The image is copied into a shared memory block, and split into bands of rows
+    (see numpy_tiled_filters), which the workers filter in place into a shared output block.
+    The result is copied out of the block into `out`, or a new array.
+
+    Args:
+        filter (str): the name of the filter
+        implementation (str): the name of the implementation (python, numba, etc.)
+        workers (int): number of worker processes (optional, default: one per cpu)
+    Returns:
+        filter_function (function):
+            taking an image (and optionally an out array) and returning the filtered image
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"workers must be positive, got {workers=}")
+    # checks that the filter exists, and filters small images in this process
+    local_filter = get_filter(filter, implementation)
+
+    def shared_memory_filter_function(image: np.array, out: np.array = None) -> np.array:
+        image = np.asarray(image)
+        bands = _band_slices(image.shape[0], image[:1].nbytes, workers)
+        if workers == 1 or len(bands) == 1:
+            return local_filter(image, out=out)
+
+        # the shape of a filtered row, e.g. without channels for gray
+        out_shape = image.shape[:1] + local_filter(image[:1]).shape[1:]
+        out = _output_array(out, out_shape)
+        in_block = shared_memory.SharedMemory(create=True, size=max(image.nbytes, 1))
+        out_block = shared_memory.SharedMemory(create=True, size=max(out.nbytes, 1))
+        shared_image = None
+        try:
+            shared_image = np.ndarray(image.shape, dtype=np.uint8, buffer=in_block.buf)
+            shared_image[...] = image
+            tasks = [
+                (in_block.name, out_block.name, image.shape, out_shape, band.start, band.stop) for band in bands
+            ]
+            _get_pool(filter, implementation, workers).map(_filter_rows, tasks)
+            out[...] = np.ndarray(out_shape, dtype=np.uint8, buffer=out_block.buf)
+        finally:
+            # release the view before closing the block
+            shared_image = None
+            in_block.close()
+            in_block.unlink()
+            out_block.close()
+            out_block.unlink()
+        return out
+
+    shared_memory_filter_function.__doc__ = f"Apply {implementation}_{filter} on {workers} processes"
+    return shared_memory_filter_function
@@ -0,0 +1,248 @@
+"""Stream mode: filter a sequence of frames with overlapped decode, filter and encode
+
+Frames are read from a directory of numbered image files,
+or as raw rgb frames from stdin (e.g. piped from ffmpeg).
+Decoding, filtering and encoding run in separate threads connected by
+bounded queues, so reading and writing frames overlaps with filtering
+(PIL, numpy and numba release the GIL while they work).
+Frame, output and work buffers are reused once a frame has been written.
+
+For example, to apply sepia to a video:
+
+    ffmpeg -i in.mp4 -f rawvideo -pix_fmt rgb24 - \\
+        | python3 -m in3110_instapy --stream - --raw-size 1920x1080 -o - -se -i numba \\
+        | ffmpeg -f rawvideo -pix_fmt rgb24 -s 1920x1080 -i - out.mp4
+"""
+from __future__ import annotations
+
+import inspect
+import queue
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from . import color_matrix, get_filter, io
+
+# marks the end of the frames in a queue
+_DONE = object()
+
+
+def find_frames(in_dir: str) -> list:
+    """List the image files in a directory, in frame order
+
+    Names are sorted by their numbers, so e.g. frame2.png comes before frame10.png.
+
+    Args:
+        in_dir (str): the directory to search
+    Returns:
+        list of Path: the image files
+    """
+    from .batch import find_images
+
+    def frame_key(path):
+        return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", path.name)]
+
+    return sorted(find_images(in_dir), key=frame_key)
+
+
+def _read_frame(stream, frame: np.array) -> bool:
+    """Read one raw frame from a binary stream into `frame`
+
+    Returns:
+        bool: False at the end of the stream
+    Raises:
+        ValueError: if the stream ends within a frame
+    """
+    view = memoryview(frame).cast("B")
+    filled = 0
+    while filled < len(view):
+        n = stream.readinto(view[filled:])
+        if not n:
+            if filled == 0:
+                return False
+            raise ValueError(f"Truncated raw frame: got {filled} of {len(view)} bytes")
+        filled += n
+    return True
+
+
+def _raw_frames(stream, width: int, height: int, free_frames: queue.Queue):
+    """Yield (name, frame) for raw rgb frames, reusing the buffers in free_frames"""
+    for n in range(sys.maxsize):
+        try:
+            frame = free_frames.get_nowait()
+        except queue.Empty:
+            frame = np.empty((height, width, 3), dtype=np.uint8)
+        if not _read_frame(stream, frame):
+            return
+        yield f"frame{n:06d}.png", frame
+
+
+def _file_frames(paths: list, free_frames: queue.Queue):
+    """Yield (name, frame) for image files
+
+    Uncompressed frames are read into the buffers in free_frames (see io.read_image_into).
+    """
+    for path in paths:
+        try:
+            frame = free_frames.get_nowait()
+        except queue.Empty:
+            frame = None
+        yield path.name, io.read_image_into(path, frame)
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Put item in a bounded queue, unless another stage stopped the stream"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+
+def _get(q: queue.Queue, stop: threading.Event):
+    """Get the next item from a queue, or _DONE if another stage stopped the stream"""
+    while not stop.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            pass
+    return _DONE
+
+
+def run_stream(
+    source: str,
+    destination: str,
+    implementation: str = "numpy",
+    filter: str = "color2sepia",
+    pipeline: str | None = None,
+    raw_size: tuple | None = None,
+    queue_size: int = 4,
+    stdin=None,
+    stdout=None,
+    encode: str | None = None,
+) -> dict:
+    """Filter a sequence of frames, overlapping decode, filter and encode
+
+    Args:
+        source (str): a directory of frames, or '-' for raw rgb frames on stdin
+        destination (str): a directory for the filtered frames, or '-' for raw frames on stdout
+            (rgb, or one byte per pixel for gray)
+        implementation (str): the filter implementation
+        filter (str): the filter name
+        pipeline (str): a color-matrix pipeline to apply instead of `filter` (optional)
+        raw_size (tuple): (width, height) of raw input frames (required for source '-')
+        queue_size (int): number of frames each queue between the stages can hold
+        stdin, stdout: binary streams to use for '-' (default: sys.stdin.buffer, sys.stdout.buffer)
+        encode (str): the encoder preset for a directory of frames, see io.ENCODE_PRESETS (optional)
+    Returns:
+        dict: summary with the number of frames, elapsed time and frames per second
+    """
+    if pipeline is not None:
+        filter_function = color_matrix.pipeline_filter(pipeline)
+    else:
+        filter_function = get_filter(filter, implementation)
+
+    # buffers that can be filled again, once their frame has been written
+    free_frames = queue.Queue()
+    free_outputs = queue.Queue()
+    if source == "-":
+        if raw_size is None:
+            raise ValueError("raw_size is required to read raw frames from stdin")
+        width, height = raw_size
+        frames = _raw_frames(stdin or sys.stdin.buffer, width, height, free_frames)
+    else:
+        frames = _file_frames(find_frames(source), free_frames)
+    if destination == "-":
+        out_stream = stdout or sys.stdout.buffer
+    else:
+        out_dir = Path(destination)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+    decoded = queue.Queue(queue_size)
+    filtered = queue.Queue(queue_size)
+    stop = threading.Event()
+    errors = []
+
+    def decode():
+        try:
+            for item in frames:
+                if not _put(decoded, item, stop):
+                    return
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        _put(decoded, _DONE, stop)
+
+    def write_frames():
+        try:
+            while (item := _get(filtered, stop)) is not _DONE:
+                name, out, frame_shape = item
+                if destination == "-":
+                    out_stream.write(memoryview(out).cast("B"))
+                else:
+                    io.write_image(out, out_dir / name, preset=encode)
+                free_outputs.put((frame_shape, out))
+            if destination == "-":
+                out_stream.flush()
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=decode, daemon=True), threading.Thread(target=write_frames, daemon=True)]
+    # filters taking work arrays get the same ones for every frame of a size
+    kwargs = {}
+    if "scratch" in inspect.signature(filter_function).parameters:
+        kwargs["scratch"] = {}
+    nframes = 0
+    frame_shape = None
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        # filter in this thread
+        while (item := _get(decoded, stop)) is not _DONE:
+            name, frame = item
+            if frame.shape != frame_shape:
+                frame_shape = frame.shape
+                if "scratch" in kwargs:
+                    kwargs["scratch"].clear()
+            # the output buffers only fit frames of the size they were made for,
+            # buffers of other sizes (still being written when the size changed) are dropped
+            out = None
+            while out is None:
+                try:
+                    out_shape, out = free_outputs.get_nowait()
+                except queue.Empty:
+                    break
+                if out_shape != frame_shape:
+                    out = None
+            out = filter_function(frame, out=out, **kwargs)
+            # frames decoded by PIL are read-only, and can't be filled again
+            if frame.flags.writeable:
+                free_frames.put(frame)
+            nframes += 1
+            if not _put(filtered, (name, out, frame_shape), stop):
+                break
+        _put(filtered, _DONE, stop)
+    except BaseException:
+        stop.set()
+        raise
+    finally:
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - start
+    if errors:
+        raise errors[0]
+
+    return {"frames": nframes, "seconds": elapsed, "fps": nframes / elapsed if elapsed else float("inf")}
+
+
+def print_summary(summary: dict, file=None) -> None:
+    """Print the frame rate of a stream run"""
+    print(f"Filtered {summary['frames']} frames in {summary['seconds']:.2f}s: {summary['fps']:.1f} frames/s", file=file)
@@ -0,0 +1,101 @@
+"""Out-of-core filtering: process images in horizontal strips
+
+The input is memory-mapped (see `io.map_image`), so only the rows of the
+current strip need to be in memory, and the strip height is chosen to keep
+the filter's temporary arrays within a memory budget.
+"""
+from __future__ import annotations
+
+import re
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from . import get_filter, io
+
+# upper bound on the memory a filter uses per pixel:
+# the uint8 input and output, plus the float64 temporaries of numpy sepia
+BYTES_PER_PIXEL = 64
+
+# outputs that can be written one strip at a time, without an encoder
+RAW_SUFFIXES = {".raw", ".rgb"}
+NETPBM_SUFFIXES = {".ppm", ".pgm"}
+
+
+def parse_size(size: str) -> int:
+    """Parse a memory size like '512M', '2G', '64k' or '1000000' to bytes"""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*", str(size), flags=re.IGNORECASE)
+    if match is None:
+        raise ValueError(f"Invalid memory size: {size!r}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** " kmgt".index(unit.lower() or " "))
+
+
+def strip_height(width: int, max_memory: int) -> int:
+    """The number of rows to filter at a time for a memory budget
+
+    Args:
+        width (int): image width in pixels
+        max_memory (int): memory budget in bytes
+    Returns:
+        int: number of rows per strip (at least 1)
+    """
+    return max(1, max_memory // (width * BYTES_PER_PIXEL))
+
+
+def run_strips(
+    file: str,
+    out_file: str,
+    implementation: str = "numpy",
+    filter: str = "color2gray",
+    max_memory: int = 256 * 1024**2,
+    raw_size: tuple | None = None,
+    encode: str | None = None,
+) -> None:
+    """Run the selected filter on one strip of rows at a time
+
+    Raw (.raw, .rgb) and netpbm (.ppm, .pgm) outputs are written
+    strip by strip. Other output formats are collected in a temporary
+    memory-mapped file, and encoded by PIL at the end.
+
+    Args:
+        file (str): the input image, or a raw rgb dump if raw_size is given
+        out_file (str): the output filename
+        implementation (str): the filter implementation
+        filter (str): the filter name
+        max_memory (int): memory budget for filtering, in bytes
+        raw_size (tuple): (width, height) of a raw rgb input (optional)
+        encode (str): the encoder preset, see io.ENCODE_PRESETS (optional)
+    """
+    if raw_size is not None:
+        width, height = raw_size
+        image = io.read_raw(file, width, height)
+    else:
+        image = io.map_image(file)
+        height, width, _ = image.shape
+
+    filter_function = get_filter(filter, implementation)
+    rows = strip_height(width, max_memory)
+    suffix = Path(out_file).suffix.lower()
+
+    def filtered_strips():
+        for y in range(0, height, rows):
+            yield filter_function(np.asarray(image[y : y + rows]))
+
+    if suffix in RAW_SUFFIXES or suffix in NETPBM_SUFFIXES:
+        with open(out_file, "wb") as f:
+            for i, strip in enumerate(filtered_strips()):
+                if i == 0 and suffix in NETPBM_SUFFIXES:
+                    magic = b"P6" if strip.ndim == 3 else b"P5"
+                    f.write(b"%s\n%d %d\n255\n" % (magic, width, height))
+                f.write(np.ascontiguousarray(strip, dtype=np.uint8).tobytes())
+        return
+
+    with tempfile.TemporaryFile(dir=Path(out_file).parent) as f:
+        out = None
+        for y, strip in zip(range(0, height, rows), filtered_strips()):
+            if out is None:
+                out = np.memmap(f, dtype=np.uint8, mode="w+", shape=(height, width) + strip.shape[2:])
+            out[y : y + rows] = strip
+        io.write_image(out, out_file, preset=encode)
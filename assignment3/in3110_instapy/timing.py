@@ -1,19 +1,18 @@
 from __future__ import annotations
 
 import time
+from contextlib import contextmanager
 from typing import Callable
 
 from . import get_filter, io
 
-from in3110_instapy import python_filters
-from in3110_instapy import numpy_filters
-from in3110_instapy import numba_filters
-
-def time_one(filter_function: Callable, *arguments, calls: int = 3) -> float:
+def time_one(filter_function: Callable, *arguments, calls: int = 3, warmup: int = 1) -> float:
     """Return the time for one call
 
     When measuring, repeat the call `calls` times,
     and return the average.
+    The first `warmup` calls are not measured, so e.g. numba's compilation
+    is not included in the time.
 
     Args:
         filter_function (callable):
@@ -23,27 +22,64 @@ def time_one(filter_function: Callable, *arguments, calls: int = 3) -> float:
         calls (int):
             The number of times to call the function,
             for measurement
+        warmup (int):
+            The number of calls before measuring
     Returns:
         time (float):
             The average time (in seconds) to run filter_function(*arguments)
     """
-    start_time = time.time()
+    for _ in range(warmup):
+        filter_function(*arguments)
+    start_time = time.perf_counter()
     for _ in range(calls):
         filter_function(*arguments)
-    end_time = time.time()
+    end_time = time.perf_counter()
     average_time = (end_time - start_time) / calls
     return average_time
-    ...
+
+
+@contextmanager
+def stage(timings: dict, name: str):
+    """Add the time spent in a `with` block to timings[name]
+
+    Used to measure where the time goes in a run, e.g.::
+
+        with stage(timings, "decode"):
+            image = io.read_image(filename)
+
+    Args:
+        timings (dict): stage name -> seconds, updated in place
+        name (str): the name of the stage
+    """
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0) + time.perf_counter() - start_time
+
+
+def format_stages(timings: dict) -> str:
+    """Format per-stage timings as one line per stage, and the total"""
+    total = sum(timings.values())
+    lines = [f"{name:>8}: {seconds:.6f}s ({100 * seconds / total if total else 0:.1f}%)" for name, seconds in timings.items()]
+    lines.append(f"{'total':>8}: {total:.6f}s")
+    return "\n".join(lines)
+
 
 def make_reports(filename: str = "test/rain.jpg", calls: int = 3):
     """
     Make timing reports for all implementations and filters,
     run for a given image.
 
+    For statistics over several image sizes, JSON output and
+    regression checks, see `in3110_instapy.benchmark`.
+
     Args:
         filename (str): the image file to use
     """
 
+    from .benchmark import measure_memory
+
     # load image
     image = io.read_image(filename)
 
@@ -58,15 +94,22 @@ def make_reports(filename: str = "test/rain.jpg", calls: int = 3):
             f"Reference (pure Python) filter time {filter_name}: {reference_time:.3}s ({calls=})"
         )
         # iterate through the implementations
-        implementations = ["numpy", "numba"]
+        implementations = ["numpy", "numba", "lut", "cython"]
         for implementation in implementations:
-            filter_func = get_filter(filter_name, implementation)
+            try:
+                filter_func = get_filter(filter_name, implementation)
+            except ImportError as e:
+                # e.g. cython, when the package was built without it
+                print(f"Skipping {implementation} {filter_name}: {e}")
+                continue
             # time the filter
             filter_time = time_one(filter_func, image, calls=calls)
             # compare the reference time to the optimized time
             speedup = reference_time / filter_time if filter_time != 0 else float('inf')
+            # and the peak memory of one call
+            peak_memory = measure_memory(filter_func, image)["peak_traced"]
             print(
-                f"Timing: {implementation} {filter_name}: {filter_time:.7}s ({speedup=:.2f}x)"
+                f"Timing: {implementation} {filter_name}: {filter_time:.7}s ({speedup=:.2f}x, peak memory {peak_memory / 1e6:.1f} MB)"
             )
 
 if __name__ == "__main__":
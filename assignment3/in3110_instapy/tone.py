@@ -0,0 +1,68 @@
+"""Tone curves computed from histograms, for the equalize and autolevels filters
+
+Both filters take two passes over the image: the first counts the values
+of each channel (a 256-bin histogram per channel), and the second remaps
+every value through a 256-entry table per channel made from the histogram.
+The implementations only differ in how they count and remap;
+the tables are made here, the same way as PIL's ImageOps.equalize
+and ImageOps.autocontrast, so the results match PIL exactly.
+"""
+from __future__ import annotations
+
+import numpy as np
+
+# filters with a histogram pass, implemented by numpy and numba_parallel
+TONE_FILTERS = ["equalize", "autolevels"]
+
+
+def equalize_tables(histograms: np.array) -> np.array:
+    """Tables spreading the values of each channel evenly over 0-255
+
+    Args:
+        histograms (np.array): (channels, 256) counts of each value
+    Returns:
+        np.array: (channels, 256) uint8 tables
+    """
+    tables = np.empty(histograms.shape, dtype=np.uint8)
+    for table, histogram in zip(tables, histograms):
+        used = np.flatnonzero(histogram)
+        if len(used) == 0:
+            table[:] = np.arange(256)
+            continue
+        # every value but the highest should be spread over the 255 steps
+        step = (histogram.sum() - histogram[used[-1]]) // 255
+        if not step:
+            table[:] = np.arange(256)
+            continue
+        # the rank of each value, rounded to steps
+        below = np.concatenate(([0], np.cumsum(histogram[:-1])))
+        np.minimum((step // 2 + below) // step, 255, out=below)
+        table[:] = below
+    return tables
+
+
+def autolevels_tables(histograms: np.array, cutoff: float = 0) -> np.array:
+    """Tables stretching the values of each channel to the full 0-255 range
+
+    Args:
+        histograms (np.array): (channels, 256) counts of each value
+        cutoff (float): percent of the darkest and brightest values to ignore (optional)
+    Returns:
+        np.array: (channels, 256) uint8 tables
+    """
+    if not 0 <= cutoff < 50:
+        raise ValueError(f"cutoff must be between 0 and 50 percent, got {cutoff=}")
+    values = np.arange(256)
+    tables = np.empty(histograms.shape, dtype=np.uint8)
+    for table, histogram in zip(tables, histograms):
+        cut = histogram.sum() * cutoff // 100
+        # the lowest and highest values left after cutting off `cut` values at each end
+        low = np.argmax(np.cumsum(histogram) > cut)
+        high = 255 - np.argmax(np.cumsum(histogram[::-1]) > cut)
+        if high <= low:
+            table[:] = values
+            continue
+        scale = 255.0 / (high - low)
+        offset = -low * scale
+        table[:] = np.clip(np.trunc(values * scale + offset), 0, 255)
+    return tables
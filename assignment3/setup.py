@@ -1,38 +1,59 @@
+import os
+
 from setuptools import setup
 
 # IN4110: set to True when you are ready for the Cython implementation
-use_cython = False
+use_cython = True
+
+# build with profiling and line tracing enabled, e.g.
+#   INSTAPY_CYTHON_DEBUG=1 pip install .
+# tracing slows down the compiled code, so it is off by default
+debug_build = os.environ.get("INSTAPY_CYTHON_DEBUG", "") not in ("", "0")
 
 
 if use_cython:
     from Cython.Build import cythonize
     from setuptools import Extension
 
+    define_macros = []
+    if debug_build:
+        # enable profiling
+        define_macros = [
+            ("CYTHON_TRACE", "1"),
+            ("CYTHON_TRACE_NOGIL", "1"),
+        ]
+
     extensions = [
         # A single module that is stand alone and has no special requisites
         Extension(
             "in3110_instapy.cython_filters",
             ["in3110_instapy/cython_filters.py"],
-            # enable profiling
-            define_macros=[
-                ("CYTHON_TRACE", "1"),
-                ("CYTHON_TRACE_NOGIL", "1"),
-            ],
+            define_macros=define_macros,
+            # OpenMP for the parallel prange loops
+            extra_compile_args=["-O3", "-fopenmp"],
+            extra_link_args=["-fopenmp"],
         ),
     ]
     cython_directives = {
         "language_level": 3,
-        # enable profiling
-        "binding": True,
-        "profile": True,
-        "linetrace": True,
-        # you may want to add some compiler directives here
-        # to optimize compilation
+        "boundscheck": False,
+        "wraparound": False,
+        "initializedcheck": False,
+        "cdivision": True,
     }
+    if debug_build:
+        cython_directives.update(
+            {
+                # enable profiling
+                "binding": True,
+                "profile": True,
+                "linetrace": True,
+            }
+        )
     ext_modules = cythonize(
         extensions,
         compiler_directives=cython_directives,
-        annotate=True,
+        annotate=debug_build,
     )
 else:
     ext_modules = []
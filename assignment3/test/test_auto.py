@@ -0,0 +1,56 @@
+import json
+
+import numpy as np
+import pytest
+from in3110_instapy import auto_filters
+from in3110_instapy.auto_filters import _crossover_points, auto_color2gray, auto_color2sepia, calibrate
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Calibrate into a temporary cache, with fast candidates only"""
+    monkeypatch.setenv("INSTAPY_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(auto_filters, "_crossovers", None)
+    monkeypatch.setattr(auto_filters, "CANDIDATES", ["numpy", "lut", "missing"])
+    monkeypatch.setattr(auto_filters, "CALIBRATION_SIZES", [(8, 8), (32, 32)])
+    return tmp_path
+
+
+def test_crossover_points():
+    assert _crossover_points([(100, "numpy"), (10000, "numba"), (1000, "numpy")]) == [[3162, "numpy"], [None, "numba"]]
+    assert _crossover_points([(100, "lut")]) == [[None, "lut"]]
+
+
+def test_calibrate(cache_dir):
+    crossovers = calibrate(sizes=[(8, 8), (32, 32)], implementations=["numpy", "lut", "missing"])
+    assert set(crossovers) == {"color2gray", "color2sepia"}
+    for points in crossovers.values():
+        assert points[-1][0] is None
+        assert {implementation for _, implementation in points} <= {"numpy", "lut"}
+    assert json.loads(cache_dir.joinpath("auto.json").read_text())["crossovers"] == crossovers
+
+
+def test_calibrates_once(cache_dir, monkeypatch):
+    auto_filters.get_crossovers()
+    assert cache_dir.joinpath("auto.json").exists()
+
+    # a new process reads the cache instead of calibrating
+    monkeypatch.setattr(auto_filters, "_crossovers", None)
+    monkeypatch.setattr(auto_filters, "calibrate", pytest.fail)
+    auto_filters.get_crossovers()
+
+
+def test_choose_implementation(monkeypatch):
+    monkeypatch.setattr(auto_filters, "_crossovers", {"color2gray": [[1000, "numpy"], [None, "lut"]]})
+    assert auto_filters.choose_implementation("color2gray", (10, 10, 3)) == "numpy"
+    assert auto_filters.choose_implementation("color2gray", (100, 100, 3)) == "lut"
+
+
+def test_color2gray(image, reference_gray):
+    np.testing.assert_allclose(auto_color2gray(image), reference_gray, atol=1)
+
+
+def test_color2sepia(image, reference_sepia):
+    out = np.empty_like(image)
+    assert auto_color2sepia(image, out=out) is out
+    np.testing.assert_allclose(out, reference_sepia, atol=1)
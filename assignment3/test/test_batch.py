@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from in3110_instapy import cli, io
+from in3110_instapy.batch import find_images, run_batch
+from in3110_instapy.numpy_filters import numpy_color2gray
+
+
+@pytest.fixture
+def image_dir(tmp_path):
+    """A directory with a few small images, and a file that isn't one"""
+    in_dir = tmp_path.joinpath("in")
+    in_dir.mkdir()
+    for i in range(5):
+        io.write_image(io.random_image(32, 24), in_dir.joinpath(f"image{i}.png"))
+    in_dir.joinpath("notes.txt").write_text("not an image")
+    return in_dir
+
+
+def test_find_images(image_dir):
+    assert [path.name for path in find_images(image_dir)] == [f"image{i}.png" for i in range(5)]
+
+
+def test_run_batch(image_dir, tmp_path):
+    out_dir = tmp_path.joinpath("out")
+    summary = run_batch(image_dir, out_dir, implementation="numpy", filter="color2gray", jobs=2)
+
+    assert summary["images"] == 5
+    assert summary["bytes"] == sum(path.stat().st_size for path in find_images(image_dir))
+    assert summary["failed"] == {}
+    assert summary["filter_seconds"] > 0 and summary["encode_seconds"] > 0
+    for i in range(5):
+        image = io.read_image(image_dir.joinpath(f"image{i}.png"))
+        filtered = io.read_image(out_dir.joinpath(f"image{i}.png"))
+        np.testing.assert_array_equal(filtered, numpy_color2gray(image))
+
+
+def test_run_batch_failures(image_dir, tmp_path):
+    image_dir.joinpath("broken.png").write_bytes(b"not a png")
+    summary = run_batch(image_dir, tmp_path.joinpath("out"), implementation="numpy", jobs=1)
+
+    assert summary["images"] == 5
+    assert list(summary["failed"]) == [str(image_dir.joinpath("broken.png"))]
+
+
+def test_run_batch_chunks(image_dir, tmp_path):
+    """Every file is filtered, whichever chunk and encoder thread it goes to"""
+    image_dir.joinpath("broken.png").write_bytes(b"not a png")
+    out_dir = tmp_path.joinpath("out")
+    summary = run_batch(image_dir, out_dir, implementation="numpy", jobs=1, chunksize=2, encode="fast", encode_threads=3)
+
+    assert summary["images"] == 5
+    assert list(summary["failed"]) == [str(image_dir.joinpath("broken.png"))]
+    assert sorted(path.name for path in out_dir.iterdir()) == [f"image{i}.png" for i in range(5)]
+    with pytest.raises(ValueError):
+        run_batch(image_dir, out_dir, chunksize=0)
+
+
+def test_cli_batch(image_dir, tmp_path, capsys):
+    out_dir = tmp_path.joinpath("out")
+    cli.main(["--batch", str(image_dir), "--out-dir", str(out_dir), "--jobs", "2", "-i", "numpy", "-se"])
+
+    assert len(list(out_dir.iterdir())) == 5
+    out = capsys.readouterr().out
+    assert "images/s" in out
+    assert "encoding:" in out
+
+
+def test_cli_batch_requires_out_dir(image_dir):
+    with pytest.raises(SystemExit):
+        cli.main(["--batch", str(image_dir), "-g"])
+
+
+@pytest.mark.parametrize("jobs", ["0", "-1"])
+def test_cli_batch_jobs(image_dir, tmp_path, jobs):
+    with pytest.raises(SystemExit):
+        cli.main(["--batch", str(image_dir), "--out-dir", str(tmp_path.joinpath("out")), "--jobs", jobs, "-g"])
@@ -0,0 +1,122 @@
+import json
+
+import pytest
+from in3110_instapy import benchmark
+from in3110_instapy.timing import time_one
+
+
+def test_measure():
+    calls = []
+    times = benchmark.measure(calls.append, 1, warmup=2, repeat=5)
+    assert len(times) == 5
+    # warm-up calls are made, but not timed
+    assert len(calls) == 7
+    assert all(t >= 0 for t in times)
+
+
+def test_time_one_warmup():
+    calls = []
+    time_one(calls.append, 1, calls=3)
+    assert len(calls) == 4
+
+
+def test_summarize():
+    summary = benchmark.summarize([4.0, 1.0, 3.0, 2.0, 5.0])
+    assert summary["median"] == 3.0
+    assert summary["min"] == 1.0
+    assert summary["iqr"] == 2.0
+    assert summary["calls"] == 5
+
+
+@pytest.fixture
+def suite():
+    return benchmark.run_suite(
+        sizes=[(16, 8), (32, 16)], implementations=["numpy", "lut", "missing"], warmup=1, repeat=3
+    )
+
+
+def test_run_suite(suite):
+    assert len(suite["results"]) == 2 * 2 * 2
+    assert set(suite["skipped"]) == {"missing"}
+    assert set(suite["skipped"]["missing"]) == {"color2gray", "color2sepia"}
+    result = suite["results"][0]
+    assert {"filter", "implementation", "width", "height", "median", "iqr", "min", "peak_traced", "peak_rss"} <= set(result)
+
+
+def test_run_suite_skipped_filters():
+    """Only the filters an implementation lacks are skipped"""
+    suite = benchmark.run_suite(
+        sizes=[(16, 8)], filters=["color2gray", "equalize"], implementations=["numpy", "lut"], warmup=1, repeat=1, memory=False
+    )
+    assert {(result["filter"], result["implementation"]) for result in suite["results"]} == {
+        ("color2gray", "numpy"),
+        ("equalize", "numpy"),
+        ("color2gray", "lut"),
+    }
+    assert list(suite["skipped"]) == ["lut"]
+    assert list(suite["skipped"]["lut"]) == ["equalize"]
+
+
+def test_run_suite_radii():
+    suite = benchmark.run_suite(
+        sizes=[(16, 8)], filters=["box_blur"], implementations=["numpy"], warmup=1, repeat=3, memory=False, radii=[1, 3]
+    )
+    assert [result["radius"] for result in suite["results"]] == [1, 3]
+    assert "box_blur r=3" in benchmark.format_result(suite["results"][1])
+
+
+def test_measure_memory():
+    import numpy as np
+
+    memory = benchmark.measure_memory(np.ones, 10_000_000)
+    # 10M float64 is 80 MB
+    assert memory["peak_traced"] >= 80_000_000
+    assert memory["peak_rss"] is None or memory["peak_rss"] >= 0
+
+
+def test_write_results(suite, tmp_path):
+    filename = tmp_path.joinpath("results.json")
+    benchmark.write_results(suite, filename)
+    assert benchmark.read_results(filename) == json.loads(json.dumps(suite))
+
+
+def _results(median, iqr=0.0, peak_traced=None):
+    result = {"filter": "color2gray", "implementation": "numpy", "width": 1, "height": 1, "median": median, "iqr": iqr}
+    if peak_traced is not None:
+        result["peak_traced"] = peak_traced
+    return {"results": [result]}
+
+
+def test_compare():
+    (row,) = benchmark.compare(_results(1.0), _results(1.05))
+    assert row["ratio"] == pytest.approx(1.05)
+    assert not row["regression"]
+
+    (row,) = benchmark.compare(_results(1.0), _results(1.5))
+    assert row["regression"]
+
+    # a slowdown within the noise is not a regression
+    (row,) = benchmark.compare(_results(1.0, iqr=1.0), _results(1.5, iqr=1.0))
+    assert not row["regression"]
+    assert "memory_regression" not in row
+
+
+def test_compare_memory():
+    (row,) = benchmark.compare(_results(1.0, peak_traced=10_000_000), _results(1.0, peak_traced=20_000_000))
+    assert row["memory_regression"]
+    assert not row["regression"]
+    assert "MEMORY REGRESSION" in benchmark.format_comparison(row)
+
+    # small growth is noise
+    (row,) = benchmark.compare(_results(1.0, peak_traced=1000), _results(1.0, peak_traced=2000))
+    assert not row["memory_regression"]
+
+
+def test_main(tmp_path, capsys):
+    baseline = tmp_path.joinpath("baseline.json")
+    current = tmp_path.joinpath("current.json")
+    assert benchmark.main(["run", "--sizes", "16x8", "-i", "numpy", "--repeat", "2", "-o", str(baseline)]) == 0
+    benchmark.write_results(_results(1.0), baseline)
+    benchmark.write_results(_results(2.0), current)
+    assert benchmark.main(["compare", str(baseline), str(current)]) == 1
+    assert "REGRESSION" in capsys.readouterr().out
@@ -0,0 +1,105 @@
+import os
+
+import numpy as np
+import pytest
+from in3110_instapy import cache, cli, io
+from in3110_instapy.batch import run_batch
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Cache into a temporary directory, with fresh statistics"""
+    monkeypatch.setenv("INSTAPY_CACHE_DIR", str(tmp_path.joinpath("cache")))
+    monkeypatch.setattr(cache, "stats", {"hits": 0, "misses": 0})
+    return tmp_path.joinpath("cache")
+
+
+@pytest.fixture
+def image_file(tmp_path):
+    path = tmp_path.joinpath("image.png")
+    io.write_image(io.random_image(32, 24), path)
+    return path
+
+
+def test_cache_key(image_file, tmp_path):
+    key = cache.cache_key(image_file, filter="color2gray", scale=1)
+    assert key == cache.cache_key(image_file, scale=1, filter="color2gray")
+    assert key != cache.cache_key(image_file, filter="color2sepia", scale=1)
+    assert key != cache.cache_key(image_file, filter="color2gray", scale=0.5)
+
+    other = tmp_path.joinpath("other.png")
+    io.write_image(io.random_image(32, 24), other)
+    assert key != cache.cache_key(other, filter="color2gray", scale=1)
+
+
+def test_lookup_store(image_file, tmp_path):
+    key = cache.cache_key(image_file)
+    out_file = tmp_path.joinpath("out.png")
+    assert not cache.lookup(key, out_file)
+
+    cache.store(key, image_file)
+    assert cache.lookup(key, out_file)
+    assert out_file.read_bytes() == image_file.read_bytes()
+    # stored per output format
+    assert not cache.lookup(key, tmp_path.joinpath("out.jpg"))
+    assert cache.stats == {"hits": 1, "misses": 2}
+
+
+def test_evict(image_file, cache_dir):
+    size = image_file.stat().st_size
+    for i, key in enumerate(["a", "b", "c"]):
+        cache.store(key, image_file)
+        os.utime(cache_dir.joinpath("results", f"{key}.png"), (i, i))
+    # using "a" makes "b" the least recently used
+    cache.lookup("a", image_file.with_name("a.png"))
+
+    cache.evict(2 * size)
+    assert sorted(path.name for path in cache_dir.joinpath("results").iterdir()) == ["a.png", "c.png"]
+
+
+def test_run_filter_cached(image_file, tmp_path, monkeypatch):
+    out_file = tmp_path.joinpath("out.png")
+    cli.run_filter(image_file, out_file, implementation="numpy", filter="color2sepia", cache=True)
+    expected = io.read_image(out_file)
+    out_file.unlink()
+
+    # a hit neither decodes nor filters
+    def fail(*args):
+        raise AssertionError("decoded a cached image")
+
+    timings = {}
+    with monkeypatch.context() as m:
+        m.setattr(cli.Image, "open", fail)
+        cli.run_filter(image_file, out_file, implementation="numpy", filter="color2sepia", cache=True, timings=timings)
+    assert list(timings) == ["cache"]
+    np.testing.assert_array_equal(io.read_image(out_file), expected)
+    assert cache.stats == {"hits": 1, "misses": 1}
+
+
+def test_cli_cache(image_file, tmp_path, capsys):
+    out_file = tmp_path.joinpath("out.png")
+    for _ in range(2):
+        cli.main([str(image_file), "-o", str(out_file), "-g", "-i", "numpy", "--cache", "--cache-size", "1M"])
+    assert capsys.readouterr().out.splitlines() == ["Cache: 0 hits, 1 misses", "Cache: 1 hits, 1 misses"]
+
+    with pytest.raises(SystemExit):
+        cli.main([str(image_file), "-g", "--cache"])
+    with pytest.raises(SystemExit):
+        cli.main([str(image_file), "-o", str(out_file), "-g", "--cache", "--cache-size", "lots"])
+
+
+def test_cli_cache_format(image_file, tmp_path):
+    """Results encoded in another format than the extension are not reused for it"""
+    from PIL import Image
+
+    cli.main([str(image_file), "-o", str(tmp_path.joinpath("a.png")), "-g", "-i", "numpy", "--format", "jpeg", "--cache"])
+    cli.main([str(image_file), "-o", str(tmp_path.joinpath("b.png")), "-g", "-i", "numpy", "--cache"])
+    assert cache.stats == {"hits": 0, "misses": 2}
+    assert Image.open(tmp_path.joinpath("b.png")).format == "PNG"
+
+
+def test_batch_cache(image_file, tmp_path):
+    summary = run_batch(image_file.parent, tmp_path.joinpath("out"), implementation="numpy", jobs=1, cache=True)
+    assert (summary["cache_hits"], summary["cache_misses"]) == (0, 1)
+    summary = run_batch(image_file.parent, tmp_path.joinpath("out"), implementation="numpy", jobs=1, cache=True)
+    assert (summary["cache_hits"], summary["cache_misses"]) == (1, 0)
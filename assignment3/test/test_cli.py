@@ -0,0 +1,69 @@
+import sys
+from io import BytesIO
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from in3110_instapy import cli, io
+from in3110_instapy.numpy_filters import numpy_color2gray, numpy_color2sepia
+from PIL import Image
+
+test_dir = Path(__file__).absolute().parent
+
+
+@pytest.fixture
+def png_bytes():
+    return io.encode_image(io.random_image(32, 24), "PNG")
+
+
+@pytest.fixture
+def stdin(monkeypatch, png_bytes):
+    monkeypatch.setattr(sys, "stdin", SimpleNamespace(buffer=BytesIO(png_bytes)))
+
+
+def decode(data):
+    return np.asarray(Image.open(BytesIO(data)))
+
+
+def test_stdin_stdout(stdin, png_bytes, capsysbinary):
+    cli.main(["-", "-g", "-i", "numpy", "-o", "-"])
+    out = capsysbinary.readouterr().out
+    # the format of the input, by default
+    assert Image.open(BytesIO(out)).format == "PNG"
+    np.testing.assert_array_equal(decode(out), numpy_color2gray(decode(png_bytes)))
+
+
+def test_stdout_format(png_bytes, tmp_path, capsysbinary):
+    in_file = tmp_path.joinpath("in.png")
+    in_file.write_bytes(png_bytes)
+    cli.main([str(in_file), "-se", "-i", "numpy", "-o", "-", "--format", "jpg", "-r"])
+    captured = capsysbinary.readouterr()
+    assert Image.open(BytesIO(captured.out)).format == "JPEG"
+    # messages go to stderr
+    assert b"Average time" in captured.err
+
+
+def test_stdin_file(stdin, png_bytes, tmp_path):
+    out_file = tmp_path.joinpath("out")
+    cli.main(["-", "-se", "-i", "numpy", "-o", str(out_file), "--format", "png"])
+    np.testing.assert_array_equal(decode(out_file.read_bytes()), numpy_color2sepia(decode(png_bytes)))
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["-", "-g", "-o", "-", "--format", "nothing"],
+        ["-", "-g", "-o", "out.png", "--max-memory", "1M"],
+        ["-", "-g", "-o", "out.png", "--cache"],
+        ["in.png", "-g", "-o", "-", "--profile", "cprofile"],
+        ["in.png", "-g", "-o", "out.png", "--encode", "tiny"],
+        ["--stream", "-", "-o", "-", "-g", "--raw-size", "10y10"],
+        ["--stream", "-", "-o", "-", "-g", "--raw-size", "10x10x3"],
+        ["--stream", "-", "-o", "-", "-g", "--raw-size", "0x10"],
+        ["in.raw", "-g", "-o", "out.png", "--max-memory", "1M", "--raw-size", "x10"],
+    ],
+)
+def test_errors(argv):
+    with pytest.raises(SystemExit):
+        cli.main(argv)
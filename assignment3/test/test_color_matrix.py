@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from in3110_instapy import cli, io
+from in3110_instapy.color_matrix import (
+    apply_color_matrix,
+    compose,
+    gain_matrix,
+    gray_matrix,
+    parse_pipeline,
+    pipeline_filter,
+    saturation_matrix,
+    sepia_matrix,
+)
+from in3110_instapy.numpy_filters import numpy_color2gray, numpy_color2sepia
+
+
+@pytest.mark.parametrize("k", [0, 0.5, 1])
+def test_sepia_matrix(image, k):
+    # a one-step pipeline is the numpy sepia filter
+    np.testing.assert_array_equal(apply_color_matrix(image, sepia_matrix(k)), numpy_color2sepia(image, k=k))
+
+
+def test_gray_matrix(image):
+    gray_image = apply_color_matrix(image, gray_matrix())
+    # all channels are the same gray, truncated instead of rounded
+    for channel in range(3):
+        np.testing.assert_allclose(gray_image[:, :, channel], numpy_color2gray(image), atol=1)
+
+
+def test_compose_order():
+    a = gain_matrix(2, 1, 1)
+    b = sepia_matrix(1)
+    # a first, then b
+    np.testing.assert_allclose(compose(a, b), b @ a)
+    np.testing.assert_allclose(compose(), np.identity(3))
+
+
+def test_saturation_matrix():
+    np.testing.assert_allclose(saturation_matrix(1), np.identity(3))
+    np.testing.assert_allclose(saturation_matrix(0), gray_matrix())
+
+
+def test_parse_pipeline():
+    np.testing.assert_allclose(parse_pipeline("sepia:0.5,gain:1.1"), compose(sepia_matrix(0.5), gain_matrix(1.1)))
+    np.testing.assert_allclose(parse_pipeline("gain:1:2:3, gray"), compose(gain_matrix(1, 2, 3), gray_matrix()))
+
+
+@pytest.mark.parametrize("spec", ["blur:3", "sepia:2", "gain", "gain:1:2", "gray:1"])
+def test_parse_pipeline_invalid(spec):
+    with pytest.raises(ValueError):
+        parse_pipeline(spec)
+
+
+def test_pipeline_is_one_pass(image):
+    """The fused pipeline matches applying the steps in sequence, while nothing saturates"""
+    image = image // 2
+    steps = image.astype(np.float64)
+    for matrix in (sepia_matrix(0.5), gain_matrix(0.9)):
+        steps = steps @ matrix.T
+    # up to rounding of the fused matrix
+    np.testing.assert_allclose(pipeline_filter("sepia:0.5,gain:0.9")(image), steps.astype(np.uint8), atol=1)
+
+
+def test_cli_pipeline(tmp_path, image):
+    in_file = tmp_path.joinpath("in.png")
+    out_file = tmp_path.joinpath("out.png")
+    io.write_image(image, in_file)
+    cli.main([str(in_file), "-o", str(out_file), "--pipeline", "sepia:0.5,gain:1.1"])
+
+    np.testing.assert_array_equal(io.read_image(out_file), pipeline_filter("sepia:0.5,gain:1.1")(image))
+
+
+def test_cli_pipeline_invalid(tmp_path):
+    with pytest.raises(SystemExit):
+        cli.main([str(tmp_path.joinpath("in.png")), "--pipeline", "sepia:5"])
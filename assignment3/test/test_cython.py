@@ -1,10 +1,28 @@
+import numpy as np
 import numpy.testing as nt
 from in3110_instapy.cython_filters import cython_color2gray, cython_color2sepia
 
 
 def test_color2gray(image, reference_gray):
-    ...
+    gray_image = cython_color2gray(image)
+
+    # check that the result has the right shape, type
+    assert gray_image.shape == image.shape[:2]
+    assert gray_image.dtype == np.uint8
+
+    nt.assert_allclose(gray_image, reference_gray, atol=1)
 
 
 def test_color2sepia(image, reference_sepia):
-    ...
+    sepia_image = cython_color2sepia(image)
+
+    assert sepia_image.shape == image.shape
+    assert sepia_image.dtype == np.uint8
+
+    nt.assert_allclose(sepia_image, reference_sepia, atol=1)
+
+
+def test_read_only_image(image, reference_sepia):
+    # const memoryviews accept arrays that can't be written to
+    image.flags.writeable = False
+    nt.assert_allclose(cython_color2sepia(image), reference_sepia, atol=1)
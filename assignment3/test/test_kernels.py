@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+from in3110_instapy import get_filter, io
+from in3110_instapy.kernels import KERNEL_FILTERS, gaussian_kernel
+
+
+@pytest.fixture
+def small_image():
+    return io.random_image(23, 17)
+
+
+def test_gaussian_kernel():
+    kernel = gaussian_kernel(3)
+    assert kernel.shape == (7,)
+    np.testing.assert_allclose(kernel.sum(), 1)
+    np.testing.assert_allclose(kernel, kernel[::-1])
+    assert np.all(np.diff(kernel[:4]) > 0)
+    np.testing.assert_array_equal(gaussian_kernel(0), [1])
+
+
+@pytest.mark.parametrize("filter_name", KERNEL_FILTERS)
+@pytest.mark.parametrize("implementation", ["numpy", "numba"])
+@pytest.mark.parametrize("radius", [0, 1, 3, 20])
+def test_matches_python(small_image, filter_name, implementation, radius):
+    """The optimized implementations give exactly the pure Python result, also for gray images"""
+    reference = get_filter(filter_name, "python")
+    filter_function = get_filter(filter_name, implementation)
+    for image in (small_image, small_image[..., 0]):
+        result = filter_function(image, radius)
+        assert result.shape == image.shape
+        assert result.dtype == np.uint8
+        np.testing.assert_array_equal(result, reference(image, radius))
+
+
+@pytest.mark.parametrize("filter_name", ["blur", "box_blur"])
+def test_blur(small_image, filter_name):
+    filter_function = get_filter(filter_name, "numpy")
+    # radius 0 and flat images are unchanged
+    np.testing.assert_array_equal(filter_function(small_image, 0), small_image)
+    flat = np.full_like(small_image, 77)
+    np.testing.assert_array_equal(filter_function(flat, 4), flat)
+    # blurring reduces the differences between neighboring pixels
+    blurred = filter_function(small_image, 2).astype(int)
+    assert np.abs(np.diff(blurred, axis=1)).mean() < np.abs(np.diff(small_image.astype(int), axis=1)).mean()
+
+
+def test_box_blur_mean():
+    image = np.zeros((9, 9), dtype=np.uint8)
+    image[4, 4] = 90
+    blurred = get_filter("box_blur", "numpy")(image, 1)
+    np.testing.assert_array_equal(blurred[3:6, 3:6], 10)
+    assert blurred.sum() == 90
+
+
+def test_sharpen():
+    image = np.full((8, 8), 100, dtype=np.uint8)
+    image[:, 4:] = 150
+    sharpened = get_filter("sharpen", "numpy")(image, 1, amount=1)
+    # the edge gets steeper, flat areas stay the same
+    assert sharpened[0, 3] < 100 and sharpened[0, 4] > 150
+    np.testing.assert_array_equal(sharpened[:, 0], 100)
+    np.testing.assert_array_equal(get_filter("sharpen", "numpy")(image, 1, amount=0), image)
+
+
+@pytest.mark.parametrize("filter_name", KERNEL_FILTERS)
+@pytest.mark.parametrize("implementation", ["python", "numpy", "numba"])
+def test_out_and_radius(small_image, filter_name, implementation):
+    filter_function = get_filter(filter_name, implementation)
+    image = small_image[:5, :6]
+    out = np.empty_like(image)
+    assert filter_function(image, 1, out=out) is out
+    np.testing.assert_array_equal(out, filter_function(image, 1))
+    with pytest.raises(ValueError):
+        filter_function(image, -1)
+    with pytest.raises(ValueError):
+        filter_function(image, 1, out=np.empty((1, 1, 3), dtype=np.uint8))
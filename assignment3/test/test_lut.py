@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+from in3110_instapy.lut_filters import lut_color2gray, lut_color2sepia, sepia_tables
+from in3110_instapy.numpy_filters import numpy_color2sepia
+
+
+def test_color2gray(image, reference_gray):
+    gray_image = lut_color2gray(image)
+
+    # check that the result has the right shape, type
+    assert gray_image.shape == image.shape[:2]
+    assert gray_image.dtype == np.uint8
+
+    np.testing.assert_allclose(gray_image, reference_gray, atol=1)
+
+
+def test_color2sepia(image, reference_sepia):
+    sepia_image = lut_color2sepia(image)
+
+    assert sepia_image.shape == image.shape
+    assert sepia_image.dtype == np.uint8
+
+    np.testing.assert_allclose(sepia_image, reference_sepia, atol=1)
+
+
+@pytest.mark.parametrize("k", [0, 0.25, 0.5])
+def test_color2sepia_k(image, k):
+    np.testing.assert_allclose(lut_color2sepia(image, k=k), numpy_color2sepia(image, k=k), atol=1)
+
+
+def test_tables_are_cached():
+    tables = sepia_tables(0.5)
+    assert sepia_tables(0.5) is tables
+    assert tables.shape == (3, 3, 256)
+    assert not tables.flags.writeable
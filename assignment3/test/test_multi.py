@@ -0,0 +1,89 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from in3110_instapy import cli, io
+from in3110_instapy.multi import output_filename, parse_output, run_outputs
+from in3110_instapy.numpy_filters import numpy_color2gray, numpy_color2sepia
+
+test_dir = Path(__file__).absolute().parent
+
+
+@pytest.fixture
+def image_file(tmp_path):
+    path = tmp_path.joinpath("image.png")
+    io.write_image(io.random_image(64, 48), path)
+    return path
+
+
+def test_parse_output():
+    assert parse_output("color2sepia:0.5") == ("color2sepia", 0.5)
+    assert parse_output("color2gray") == ("color2gray", 1)
+    for spec in ["color2gray:2", "color2gray:x", ":0.5"]:
+        with pytest.raises(ValueError):
+            parse_output(spec)
+
+
+def test_run_outputs(image_file, tmp_path):
+    outputs = [("color2gray", 1), ("color2sepia", 1), ("color2gray", 0.5), ("color2sepia", 0.25)]
+    timings = {}
+    out_files = run_outputs(image_file, outputs, tmp_path.joinpath("out"), implementation="numpy", jobs=2, timings=timings)
+
+    assert out_files == [output_filename(image_file, tmp_path.joinpath("out"), *output) for output in outputs]
+    assert out_files[2].name == "image_color2gray_0.5.png"
+    assert set(timings) == {"decode", "resize", "filter", "encode"}
+
+    image = io.read_image(image_file)
+    np.testing.assert_array_equal(io.read_image(out_files[0]), numpy_color2gray(image))
+    np.testing.assert_array_equal(io.read_image(out_files[1]), numpy_color2sepia(image))
+    assert io.read_image(out_files[2]).shape == (24, 32)
+    assert io.read_image(out_files[3]).shape == (12, 16, 3)
+
+
+def test_run_outputs_duplicates(image_file, tmp_path):
+    out_dir = tmp_path.joinpath("out")
+    outputs = [parse_output(spec) for spec in ["color2gray", "color2sepia:0.5", "color2gray:1.0", "color2sepia:0.50"]]
+    out_files = run_outputs(image_file, outputs, out_dir, implementation="numpy")
+    assert [path.name for path in out_files] == ["image_color2gray_1.png", "image_color2sepia_0.5.png"]
+
+
+def test_pyramid(tmp_path):
+    """Resizing from the next larger level is close to resizing the original"""
+    source = tmp_path.joinpath("rain.png")
+    io.write_image(io.read_image(test_dir.joinpath("rain.jpg")), source)
+    outputs = [("color2gray", 0.5), ("color2gray", 0.25)]
+    out_file, = run_outputs(source, outputs[1:], tmp_path.joinpath("direct"), implementation="numpy")
+    pyramid_file = run_outputs(source, outputs, tmp_path.joinpath("pyramid"), implementation="numpy")[1]
+    difference = io.read_image(pyramid_file).astype(int) - io.read_image(out_file)
+    assert np.abs(difference).mean() < 3
+
+
+def test_cli_outputs(image_file, tmp_path, capsys):
+    out_dir = tmp_path.joinpath("out")
+    cli.main([str(image_file), "-i", "numpy", "--out-dir", str(out_dir), "--encode", "fast", "--outputs", "color2gray:0.5", "color2sepia"])
+    assert sorted(path.name for path in out_dir.iterdir()) == ["image_color2gray_0.5.png", "image_color2sepia_1.png"]
+    assert "encode" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["image.png", "-g", "--out-dir", "out", "--outputs", "color2gray"],
+        ["image.png", "--outputs", "color2gray"],
+        ["image.png", "--out-dir", "out", "--outputs", "color2gray:3"],
+        ["image.png", "-i", "python", "--out-dir", "out", "--outputs", "equalize"],
+        ["image.png", "--jobs", "0", "--out-dir", "out", "--outputs", "color2gray"],
+    ],
+)
+def test_cli_outputs_errors(argv):
+    with pytest.raises(SystemExit):
+        cli.main(argv)
+
+
+def test_cli_outputs_missing_backend(monkeypatch, tmp_path):
+    def get_filter(filter, implementation):
+        raise ImportError("not built")
+
+    monkeypatch.setattr("in3110_instapy.get_filter", get_filter)
+    with pytest.raises(SystemExit):
+        cli.main(["image.png", "--out-dir", str(tmp_path), "--outputs", "color2gray"])
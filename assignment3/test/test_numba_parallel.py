@@ -0,0 +1,27 @@
+import numpy as np
+from in3110_instapy.numba_parallel_filters import numba_parallel_color2gray, numba_parallel_color2sepia
+
+
+def test_color2gray(image, reference_gray):
+    gray_image = numba_parallel_color2gray(image)
+
+    # check that the result has the right shape, type
+    assert gray_image.shape == image.shape[:2]
+    assert gray_image.dtype == np.uint8
+
+    # fastmath may round differently from the reference by one level
+    np.testing.assert_allclose(gray_image, reference_gray, atol=1)
+
+
+def test_color2sepia(image, reference_sepia):
+    sepia_image = numba_parallel_color2sepia(image)
+
+    assert sepia_image.shape == image.shape
+    assert sepia_image.dtype == np.uint8
+
+    np.testing.assert_allclose(sepia_image, reference_sepia, atol=1)
+
+
+def test_read_only_image(image):
+    image.flags.writeable = False
+    np.testing.assert_array_equal(numba_parallel_color2sepia(image), numba_parallel_color2sepia(image.copy()))
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+from in3110_instapy.numpy_int_filters import numpy_int_color2gray, numpy_int_color2sepia
+from in3110_instapy.numpy_filters import numpy_color2sepia
+
+
+def test_color2gray(image, reference_gray):
+    gray_image = numpy_int_color2gray(image)
+
+    # check that the result has the right shape, type
+    assert gray_image.shape == image.shape[:2]
+    assert gray_image.dtype == np.uint8
+
+    # fixed-point weights are within one level of the reference
+    np.testing.assert_allclose(gray_image, reference_gray, atol=1)
+
+
+def test_color2sepia(image, reference_sepia):
+    sepia_image = numpy_int_color2sepia(image)
+
+    assert sepia_image.shape == image.shape
+    assert sepia_image.dtype == np.uint8
+
+    np.testing.assert_allclose(sepia_image, reference_sepia, atol=1)
+
+
+def test_saturation():
+    # white saturates at 255 in the red and green channels
+    white = np.full((1, 1, 3), 255, dtype=np.uint8)
+    np.testing.assert_allclose(numpy_int_color2sepia(white)[0, 0], [255, 255, 238], atol=1)
+
+
+@pytest.mark.parametrize("k", [0, 0.25, 0.5])
+def test_color2sepia_k(image, k):
+    sepia_image = numpy_int_color2sepia(image, k=k)
+    np.testing.assert_allclose(sepia_image, numpy_color2sepia(image, k=k), atol=1)
+
+
+def test_invalid_k(image):
+    with pytest.raises(ValueError):
+        numpy_int_color2sepia(image, k=-1)
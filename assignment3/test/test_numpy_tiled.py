@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+from in3110_instapy.numpy_filters import numpy_color2gray, numpy_color2sepia
+from in3110_instapy.numpy_tiled_filters import numpy_tiled_color2gray, numpy_tiled_color2sepia
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+@pytest.mark.parametrize("band_rows", [None, 1, 7, 1000])
+def test_color2gray(image, workers, band_rows):
+    gray_image = numpy_tiled_color2gray(image, workers=workers, band_rows=band_rows)
+
+    # check that the result has the right shape, type
+    assert gray_image.shape == image.shape[:2]
+    assert gray_image.dtype == np.uint8
+
+    # tiling must not change the result
+    np.testing.assert_array_equal(gray_image, numpy_color2gray(image))
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+@pytest.mark.parametrize("band_rows", [None, 1, 7, 1000])
+@pytest.mark.parametrize("k", [0, 0.5, 1])
+def test_color2sepia(image, workers, band_rows, k):
+    sepia_image = numpy_tiled_color2sepia(image, k=k, workers=workers, band_rows=band_rows)
+
+    assert sepia_image.shape == image.shape
+    assert sepia_image.dtype == np.uint8
+
+    np.testing.assert_array_equal(sepia_image, numpy_color2sepia(image, k=k))
+
+
+def test_invalid_arguments(image):
+    with pytest.raises(ValueError):
+        numpy_tiled_color2sepia(image, k=2)
+    with pytest.raises(ValueError):
+        numpy_tiled_color2gray(image, workers=0)
+    with pytest.raises(ValueError):
+        numpy_tiled_color2gray(image, band_rows=0)
@@ -18,13 +18,55 @@ def test_import():
     import in3110_instapy  # noqa
 
 
+def test_read_image_into(tmp_path, image):
+    """Uncompressed files are read into the given buffer, others are decoded"""
+    from in3110_instapy import io
+
+    buffer = np.empty_like(image)
+    io.write_image(image, tmp_path / "image.ppm")
+    assert io.read_image_into(tmp_path / "image.ppm", buffer) is buffer
+    np.testing.assert_array_equal(buffer, image)
+    # a buffer of another size is not used
+    small = np.empty((2, 2, 3), dtype=np.uint8)
+    np.testing.assert_array_equal(io.read_image_into(tmp_path / "image.ppm", small), image)
+
+    io.write_image(image, tmp_path / "image.png")
+    read = io.read_image_into(tmp_path / "image.png", buffer)
+    assert read is not buffer
+    np.testing.assert_array_equal(read, image)
+
+
+def test_encode_presets(tmp_path):
+    """Presets change the encoding of lossless formats, but not the pixels"""
+    from in3110_instapy import io
+
+    # a gradient, which compresses better with more effort (unlike random pixels)
+    image = np.broadcast_to(np.arange(256, dtype=np.uint8)[:, None, None], (256, 200, 3)) ^ np.arange(200, dtype=np.uint8)[None, :, None]
+
+    sizes = {}
+    for preset in io.ENCODE_PRESETS:
+        filename = tmp_path / f"{preset}.png"
+        io.write_image(image, filename, preset=preset)
+        np.testing.assert_array_equal(io.read_image(filename), image)
+        sizes[preset] = filename.stat().st_size
+    assert sizes["small"] <= sizes["fast"]
+    assert io.encoder_options("JPEG", "small")["progressive"]
+    assert io.encoder_options("GIF", "fast") == {}
+    assert io.encoder_options("PNG") == {}
+    # explicit options override the preset
+    fast = io.encode_image(image, "JPEG", preset="fast")
+    assert io.encode_image(image, "JPEG", preset="fast", quality=20) != fast
+    with pytest.raises(ValueError):
+        io.encoder_options("PNG", "tiny")
+
+
 @pytest.mark.parametrize(
     "filter_name",
     ["color2gray", "color2sepia"],
 )
 @pytest.mark.parametrize(
     "implementation",
-    ["python", "numpy", "numba"],
+    ["python", "numpy", "numba", "numpy_tiled", "numba_parallel", "numpy_int", "lut"],
 )
 def test_get_filter(filter_name, implementation):
     """Can we load our filter functions"""
@@ -42,3 +84,149 @@ def test_io():
     assert len(image.shape) == 3
     assert image.dtype == np.uint8
     assert image.shape[2] == 3
+
+
+def test_read_image_scale(tmp_path):
+    """Downscaled JPEG files are decoded at reduced resolution, with nearly the same result"""
+    from in3110_instapy import io
+    from PIL import Image
+
+    rain = Image.open(test_dir.joinpath("rain.jpg"))
+    filename = tmp_path / "large.jpg"
+    rain.resize((rain.width * 4, rain.height * 4)).save(filename)
+
+    size = io.scaled_size(Image.open(filename).size, 0.25)
+    decoded = io.decode_image(Image.open(filename), size)
+    assert decoded.size[0] < 2 * size[0]
+    assert decoded.size[0] >= size[0] and decoded.size[1] >= size[1]
+
+    image = io.read_image(filename, scale=0.25)
+    assert image.shape == (size[1], size[0], 3)
+    full = np.asarray(Image.open(filename).resize(size, Image.Resampling.LANCZOS))
+    assert np.abs(image.astype(int) - full).mean() < 3
+
+
+@pytest.mark.parametrize("suffix", [".png", ".ppm", ".pgm", ".raw"])
+def test_write_image(tmp_path, image, suffix):
+    """Images are written unchanged, straight from their buffer for raw and netpbm files"""
+    from in3110_instapy import io
+
+    array = image[:20, :30]
+    if suffix == ".pgm":
+        array = array[..., 0]
+    filename = tmp_path / f"out{suffix}"
+    io.write_image(array, filename)
+    if suffix == ".raw":
+        written = np.fromfile(filename, dtype=np.uint8).reshape(array.shape)
+    else:
+        written = io.read_image(filename)
+    np.testing.assert_array_equal(written, array)
+
+
+@pytest.mark.parametrize(
+    "filter_name",
+    ["color2gray", "color2sepia"],
+)
+@pytest.mark.parametrize(
+    "implementation",
+    ["python", "numpy", "numba", "numpy_tiled", "numba_parallel", "numpy_int", "lut"],
+)
+def test_read_only_input(filter_name, implementation, image):
+    """Filters accept the read-only arrays viewing PIL's pixel data, without copying them"""
+    import in3110_instapy  # noqa
+
+    filter_function = in3110_instapy.get_filter(filter_name, implementation)
+    image = image[:20, :30]
+    expected = filter_function(image)
+    read_only = image.copy()
+    read_only.flags.writeable = False
+    np.testing.assert_array_equal(filter_function(read_only), expected)
+
+
+@pytest.mark.parametrize(
+    "filter_name",
+    ["color2gray", "color2sepia"],
+)
+@pytest.mark.parametrize(
+    "implementation",
+    ["python", "numpy", "numba", "numpy_tiled", "numba_parallel", "numpy_int", "lut"],
+)
+def test_out_argument(filter_name, implementation, image):
+    """Filters write into a caller-provided output array, and return it"""
+    import in3110_instapy  # noqa
+
+    filter_function = in3110_instapy.get_filter(filter_name, implementation)
+    image = image[:20, :30]
+    expected = filter_function(image)
+    out = np.zeros_like(expected)
+    assert filter_function(image, out=out) is out
+    np.testing.assert_array_equal(out, expected)
+
+    with pytest.raises(ValueError):
+        filter_function(image, out=np.zeros((1,) * expected.ndim, dtype=np.uint8))
+
+
+def test_numpy_scratch(image):
+    """numpy filters reuse caller-provided scratch arrays"""
+    from in3110_instapy.numpy_filters import numpy_color2gray, numpy_color2sepia
+
+    gray_scratch = np.empty((2,) + image.shape[:2], dtype=np.float32)
+    np.testing.assert_array_equal(numpy_color2gray(image, scratch=gray_scratch), numpy_color2gray(image))
+    sepia_scratch = np.empty(image.shape, dtype=np.float64)
+    np.testing.assert_array_equal(numpy_color2sepia(image, k=0.5, scratch=sepia_scratch), numpy_color2sepia(image, k=0.5))
+
+    with pytest.raises(ValueError):
+        numpy_color2gray(image, scratch=np.empty(image.shape[:2], dtype=np.float32))
+
+
+def test_available_implementations():
+    """Implementations are listed without importing them"""
+    import sys
+
+    import in3110_instapy  # noqa
+
+    sys.modules.pop("in3110_instapy.numba_filters", None)
+    implementations = in3110_instapy.available_implementations()
+    assert {"python", "numpy", "numba"} <= set(implementations)
+    assert "in3110_instapy.numba_filters" not in sys.modules
+
+
+def test_register_filter(monkeypatch):
+    import in3110_instapy  # noqa
+
+    monkeypatch.setattr(in3110_instapy, "_registry", {})
+
+    def plugin_color2gray(image):
+        return image[:, :, 0]
+
+    in3110_instapy.register_filter("color2gray", "plugin", plugin_color2gray)
+    assert in3110_instapy.get_filter("color2gray", "plugin") is plugin_color2gray
+    assert "plugin" in in3110_instapy.available_implementations()
+
+    # lazy registration by import path
+    in3110_instapy.register_filter("color2sepia", "plugin", "in3110_instapy.numpy_filters:numpy_color2sepia")
+    from in3110_instapy.numpy_filters import numpy_color2sepia
+
+    assert in3110_instapy.get_filter("color2sepia", "plugin") is numpy_color2sepia
+
+
+def test_entry_points(monkeypatch):
+    """Plugins register implementation modules and single filters with entry points"""
+    from importlib import metadata
+
+    import in3110_instapy  # noqa
+
+    plugins = [
+        metadata.EntryPoint("fast", "in3110_instapy.numpy_filters", in3110_instapy.ENTRY_POINT_GROUP),
+        metadata.EntryPoint("fast.color2gray", "in3110_instapy.lut_filters:lut_color2gray", in3110_instapy.ENTRY_POINT_GROUP),
+    ]
+    monkeypatch.setattr(metadata, "entry_points", lambda group: plugins)
+    monkeypatch.setattr(in3110_instapy, "_registry", {})
+    monkeypatch.setattr(in3110_instapy, "_implementation_modules", {})
+    monkeypatch.setattr(in3110_instapy, "_entry_points_loaded", False)
+
+    from in3110_instapy.lut_filters import lut_color2gray
+
+    assert in3110_instapy.get_filter("color2gray", "fast") is lut_color2gray
+    assert in3110_instapy._implementation_modules == {"fast": "in3110_instapy.numpy_filters"}
+    assert "fast" in in3110_instapy.available_implementations()
@@ -0,0 +1,50 @@
+import io as _io
+
+import pytest
+from in3110_instapy import cli, io
+from in3110_instapy.numba_filters import numba_color2gray
+from in3110_instapy.numpy_filters import numpy_color2gray
+from in3110_instapy.profiling import profile_with_cprofile, profile_with_line_profiler
+from in3110_instapy.timing import format_stages, stage
+
+
+def test_stage():
+    timings = {}
+    with stage(timings, "filter"):
+        pass
+    with stage(timings, "filter"):
+        pass
+    assert list(timings) == ["filter"]
+    assert timings["filter"] >= 0
+    assert "total" in format_stages(timings)
+
+
+def test_profile_with_cprofile(image):
+    stream = _io.StringIO()
+    profile_with_cprofile(numpy_color2gray, image, stream=stream)
+    assert "numpy_color2gray" in stream.getvalue()
+
+
+@pytest.mark.parametrize("filter_function", [numpy_color2gray, numba_color2gray])
+def test_profile_with_line_profiler(image, filter_function):
+    stream = _io.StringIO()
+    profile_with_line_profiler(filter_function, image, stream=stream)
+    assert "Timer unit" in stream.getvalue()
+
+
+@pytest.mark.parametrize("profiler", ["cprofile", "line"])
+def test_cli_profile(tmp_path, image, profiler, capsys):
+    in_file = tmp_path.joinpath("in.png")
+    profile_file = tmp_path.joinpath("profile.txt")
+    io.write_image(image, in_file)
+    cli.main(
+        [str(in_file), "-o", str(tmp_path.joinpath("out.png")), "-g", "-i", "numpy",
+         "--profile", profiler, "--profile-out", str(profile_file)]
+    )
+
+    stats = profile_file.read_text()
+    out = capsys.readouterr().out
+    for name in ("decode", "filter", "encode"):
+        assert name in stats
+        assert name in out
+    assert "run_filter" in stats
@@ -0,0 +1,138 @@
+import threading
+from http.client import HTTPConnection
+from io import BytesIO
+from pathlib import Path
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import numpy as np
+import pytest
+from in3110_instapy import io
+from in3110_instapy.numpy_filters import numpy_color2gray
+from in3110_instapy.serve import FilterServer, filter_bytes
+from PIL import Image
+
+test_dir = Path(__file__).absolute().parent
+
+
+@pytest.fixture(scope="module")
+def server():
+    server = FilterServer(("localhost", 0), jobs=1, warm=["numpy"])
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://localhost:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def png_bytes():
+    return io.encode_image(io.random_image(32, 24), "PNG")
+
+
+def test_filter_bytes(png_bytes):
+    result, format = filter_bytes(png_bytes, "color2gray", "numpy")
+    assert format == "PNG"
+    expected = numpy_color2gray(np.asarray(Image.open(BytesIO(png_bytes))))
+    np.testing.assert_array_equal(np.asarray(Image.open(BytesIO(result))), expected)
+
+    result, format = filter_bytes(png_bytes, "color2sepia", "numpy", scale=0.5, format="jpeg")
+    assert format == "JPEG"
+    assert Image.open(BytesIO(result)).size == (16, 12)
+
+    result, format = filter_bytes(png_bytes, "color2gray", "numpy", format="jpg")
+    assert format == "JPEG"
+    assert Image.open(BytesIO(result)).format == "JPEG"
+    with pytest.raises(ValueError):
+        filter_bytes(png_bytes, format="nothing")
+
+
+def test_filter(server, png_bytes):
+    with urlopen(f"{server}/filter?filter=color2gray&implementation=numpy", data=png_bytes) as response:
+        assert response.status == 200
+        assert response.headers["Content-Type"] == "image/png"
+        result = response.read()
+    expected = numpy_color2gray(np.asarray(Image.open(BytesIO(png_bytes))))
+    np.testing.assert_array_equal(np.asarray(Image.open(BytesIO(result))), expected)
+
+
+@pytest.mark.parametrize(
+    "query, data",
+    [
+        ("filter=color2nothing", None),
+        ("implementation=nothing", None),
+        ("scale=2", None),
+        ("scale=x", None),
+        ("", b"not an image"),
+    ],
+)
+def test_bad_requests(server, png_bytes, query, data):
+    with pytest.raises(HTTPError) as error:
+        urlopen(f"{server}/filter?{query}", data=data or png_bytes)
+    assert error.value.code == 400
+
+
+@pytest.fixture
+def small_server(png_bytes):
+    """A server taking uploads up to the size of png_bytes, with its filter replaced by a failing one"""
+    server = FilterServer(("localhost", 0), jobs=1, warm=[], max_body=len(png_bytes))
+
+    def filter(data, **params):
+        raise OSError("disk full")
+
+    server.filter = filter
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_max_body(small_server, png_bytes):
+    connection = HTTPConnection("localhost", small_server.server_address[1])
+    connection.request("POST", "/filter", body=png_bytes + b"x")
+    assert connection.getresponse().status == 413
+    connection.close()
+
+    connection = HTTPConnection("localhost", small_server.server_address[1])
+    connection.putrequest("POST", "/filter")
+    connection.putheader("Content-Length", "-1")
+    connection.endheaders()
+    assert connection.getresponse().status == 400
+    connection.close()
+
+
+def test_server_error(small_server, png_bytes):
+    # i/o failures on the server are not the client's fault
+    with pytest.raises(HTTPError) as error:
+        urlopen(f"http://localhost:{small_server.server_address[1]}/filter", data=png_bytes)
+    assert error.value.code == 500
+
+
+def test_broken_image(png_bytes):
+    with pytest.raises(ValueError):
+        filter_bytes(png_bytes[: len(png_bytes) // 2])
+
+
+def test_not_found(server):
+    with pytest.raises(HTTPError) as error:
+        urlopen(f"{server}/nothing")
+    assert error.value.code == 404
+
+
+def test_metrics(server, png_bytes):
+    urlopen(f"{server}/filter", data=png_bytes).read()
+    with urlopen(f"{server}/metrics") as response:
+        metrics = response.read().decode()
+    assert 'instapy_requests_total{status="200"}' in metrics
+    assert "instapy_request_latency_seconds_count" in metrics
+    assert "instapy_queue_depth 0" in metrics
+    assert "instapy_workers 1" in metrics
+
+
+def test_cli_serve_help(capsys):
+    from in3110_instapy import cli
+
+    with pytest.raises(SystemExit):
+        cli.main(["serve", "--help"])
+    assert "--max-body" in capsys.readouterr().out
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from in3110_instapy import io
+from in3110_instapy.shared import shared_memory_filter
+
+
+@pytest.fixture
+def large_image():
+    # large enough to be split into several bands
+    return io.random_image(640, 480)
+
+
+@pytest.mark.parametrize("implementation", ["python", "numpy"])
+def test_color2gray(large_image, implementation):
+    from in3110_instapy import get_filter
+
+    expected = get_filter("color2gray", implementation)(large_image)
+    filter_function = shared_memory_filter("color2gray", implementation, workers=2)
+    np.testing.assert_array_equal(filter_function(large_image), expected)
+
+
+def test_color2sepia_out(large_image):
+    from in3110_instapy.numpy_filters import numpy_color2sepia
+
+    filter_function = shared_memory_filter("color2sepia", "numpy", workers=2)
+    out = np.empty_like(large_image)
+    assert filter_function(large_image, out=out) is out
+    np.testing.assert_array_equal(out, numpy_color2sepia(large_image))
+
+    with pytest.raises(ValueError):
+        filter_function(large_image, out=np.empty((1, 1, 3), dtype=np.uint8))
+
+
+def test_small_image(image):
+    from in3110_instapy.numpy_filters import numpy_color2gray
+
+    # a single band is filtered in this process
+    filter_function = shared_memory_filter("color2gray", "numpy", workers=2)
+    np.testing.assert_array_equal(filter_function(image[:4]), numpy_color2gray(image[:4]))
+
+
+def test_invalid():
+    with pytest.raises(ValueError):
+        shared_memory_filter(workers=0)
+    with pytest.raises(AttributeError):
+        shared_memory_filter("color2nothing", "numpy")
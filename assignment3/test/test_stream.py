@@ -0,0 +1,117 @@
+import io as _io
+
+import numpy as np
+import pytest
+from in3110_instapy import cli, io
+from in3110_instapy.numpy_filters import numpy_color2gray, numpy_color2sepia
+from in3110_instapy.stream import find_frames, run_stream
+
+
+@pytest.fixture
+def frame_dir(tmp_path):
+    """A directory of numbered frames"""
+    in_dir = tmp_path.joinpath("frames")
+    in_dir.mkdir()
+    for i in [1, 2, 10]:
+        io.write_image(io.random_image(32, 24), in_dir.joinpath(f"frame{i}.png"))
+    return in_dir
+
+
+def raw_frames(n, width=16, height=8):
+    return [io.random_image(width, height) for _ in range(n)]
+
+
+def test_find_frames(frame_dir):
+    assert [path.name for path in find_frames(frame_dir)] == ["frame1.png", "frame2.png", "frame10.png"]
+
+
+def test_stream_directory(frame_dir, tmp_path):
+    out_dir = tmp_path.joinpath("out")
+    summary = run_stream(frame_dir, out_dir, implementation="numpy", filter="color2sepia")
+
+    assert summary["frames"] == 3
+    assert summary["fps"] > 0
+    for path in find_frames(frame_dir):
+        filtered = io.read_image(out_dir.joinpath(path.name))
+        np.testing.assert_array_equal(filtered, numpy_color2sepia(io.read_image(path)))
+
+
+@pytest.mark.parametrize("filter_name, filter_function", [("color2gray", numpy_color2gray), ("color2sepia", numpy_color2sepia)])
+def test_stream_raw(filter_name, filter_function):
+    # more frames than fit in the queues, so buffers are reused
+    frames = raw_frames(20)
+    stdin = _io.BytesIO(b"".join(frame.tobytes() for frame in frames))
+    stdout = _io.BytesIO()
+    summary = run_stream("-", "-", implementation="numpy", filter=filter_name, raw_size=(16, 8), queue_size=2, stdin=stdin, stdout=stdout)
+
+    assert summary["frames"] == 20
+    assert stdout.getvalue() == b"".join(filter_function(frame).tobytes() for frame in frames)
+
+
+@pytest.mark.parametrize("suffix", [".png", ".ppm"])
+def test_stream_mixed_sizes(tmp_path, suffix):
+    """Buffers made for frames of one size are not reused for another"""
+    in_dir = tmp_path.joinpath("frames")
+    in_dir.mkdir()
+    for i in range(20):
+        io.write_image(io.random_image(200, 30), in_dir.joinpath(f"frame{i}{suffix}"))
+    for i in range(20, 40):
+        io.write_image(io.random_image(180, 30), in_dir.joinpath(f"frame{i}{suffix}"))
+    out_dir = tmp_path.joinpath("out")
+    summary = run_stream(in_dir, out_dir, implementation="numpy", filter="color2sepia", queue_size=2)
+
+    assert summary["frames"] == 40
+    for path in find_frames(in_dir):
+        np.testing.assert_array_equal(io.read_image(out_dir.joinpath(path.name)), numpy_color2sepia(io.read_image(path)))
+
+
+def test_stream_scratch(monkeypatch):
+    """Filters taking work arrays get the same ones for every frame"""
+    scratches = []
+
+    def color2gray(image, out=None, scratch=None):
+        scratches.append(scratch)
+        return numpy_color2gray(image, out=out, scratch=scratch)
+
+    monkeypatch.setattr("in3110_instapy.stream.get_filter", lambda filter, implementation: color2gray)
+    stdin = _io.BytesIO(b"".join(frame.tobytes() for frame in raw_frames(5)))
+    run_stream("-", "-", raw_size=(16, 8), stdin=stdin, stdout=_io.BytesIO())
+
+    assert len(scratches) == 5
+    assert all(scratch is scratches[0] for scratch in scratches)
+    assert len(scratches[0]) == 1
+
+
+def test_stream_truncated():
+    stdin = _io.BytesIO(raw_frames(1)[0].tobytes()[:-1])
+    with pytest.raises(ValueError):
+        run_stream("-", "-", raw_size=(16, 8), stdin=stdin, stdout=_io.BytesIO())
+
+
+def test_stream_encode_error(frame_dir, tmp_path):
+    # an error while writing a frame stops the other stages
+    out_dir = tmp_path.joinpath("out")
+    out_dir.joinpath("frame2.png").mkdir(parents=True)
+    with pytest.raises(OSError):
+        run_stream(frame_dir, out_dir, queue_size=1)
+
+
+def test_cli_stream(frame_dir, tmp_path, capsys):
+    out_dir = tmp_path.joinpath("out")
+    cli.main(["--stream", str(frame_dir), "--out-dir", str(out_dir), "-i", "numpy", "--pipeline", "sepia:0.5"])
+
+    assert len(list(out_dir.iterdir())) == 3
+    assert "frames/s" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["--stream", "-", "-o", "-", "-g"],
+        ["--stream", "frames", "-g"],
+        ["--stream", "frames", "-o", "out.png", "-g"],
+    ],
+)
+def test_cli_stream_errors(argv):
+    with pytest.raises(SystemExit):
+        cli.main(argv)
@@ -0,0 +1,79 @@
+import numpy as np
+import pytest
+from in3110_instapy import cli, io
+from in3110_instapy.numpy_filters import numpy_color2gray, numpy_color2sepia
+from in3110_instapy.strips import parse_size, run_strips, strip_height
+
+
+@pytest.mark.parametrize(
+    "size, expected",
+    [("1000", 1000), ("64k", 64 * 1024), ("512M", 512 * 1024**2), ("2GB", 2 * 1024**3), ("1.5m", 1536 * 1024)],
+)
+def test_parse_size(size, expected):
+    assert parse_size(size) == expected
+
+
+def test_parse_size_invalid():
+    with pytest.raises(ValueError):
+        parse_size("lots")
+
+
+def test_strip_height():
+    assert strip_height(1000, 64 * 1000 * 10) == 10
+    # never less than one row
+    assert strip_height(1000, 1) == 1
+
+
+@pytest.mark.parametrize("suffix", [".ppm", ".tif", ".png", ".jpg"])
+def test_map_image(tmp_path, image, suffix):
+    filename = tmp_path.joinpath("image" + suffix)
+    io.write_image(image, filename)
+    mapped = io.map_image(filename)
+    assert isinstance(mapped, np.memmap)
+    np.testing.assert_array_equal(mapped, io.read_image(filename))
+
+
+@pytest.mark.parametrize("out_suffix", [".png", ".ppm", ".pgm", ".raw"])
+def test_run_strips_gray(tmp_path, image, out_suffix):
+    in_file = tmp_path.joinpath("in.ppm")
+    out_file = tmp_path.joinpath("out" + out_suffix)
+    io.write_image(image, in_file)
+    # small enough for several strips
+    run_strips(in_file, out_file, implementation="numpy", filter="color2gray", max_memory=50_000)
+
+    expected = numpy_color2gray(image)
+    if out_suffix == ".raw":
+        result = np.fromfile(out_file, dtype=np.uint8).reshape(expected.shape)
+    else:
+        result = io.read_image(out_file)
+    np.testing.assert_array_equal(result, expected)
+
+
+def test_run_strips_raw_input(tmp_path, image):
+    in_file = tmp_path.joinpath("in.rgb")
+    out_file = tmp_path.joinpath("out.ppm")
+    image.tofile(in_file)
+    height, width, _ = image.shape
+    cli.main([str(in_file), "-o", str(out_file), "-se", "-i", "numpy", "--max-memory", "64k", "--raw-size", f"{width}x{height}"])
+
+    np.testing.assert_array_equal(io.read_image(out_file), numpy_color2sepia(image))
+
+
+def test_cli_max_memory_requires_out(tmp_path):
+    with pytest.raises(SystemExit):
+        cli.main([str(tmp_path.joinpath("in.png")), "-g", "--max-memory", "1M"])
+
+
+def test_cli_max_memory_invalid(tmp_path):
+    with pytest.raises(SystemExit):
+        cli.main([str(tmp_path.joinpath("in.png")), "-g", "-o", str(tmp_path.joinpath("out.png")), "--max-memory", "lots"])
+
+
+def test_raw_size_mismatch(tmp_path, capsys):
+    in_file = tmp_path.joinpath("in.rgb")
+    in_file.write_bytes(bytes(1000))
+    with pytest.raises(ValueError):
+        io.read_raw(in_file, 100, 100)
+    with pytest.raises(SystemExit):
+        cli.main([str(in_file), "-g", "-o", str(tmp_path.joinpath("out.png")), "--max-memory", "1M", "--raw-size", "100x100"])
+    assert "1000 bytes" in capsys.readouterr().err
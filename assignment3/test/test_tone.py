@@ -0,0 +1,90 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from in3110_instapy import cli, get_filter, io
+from in3110_instapy.tone import TONE_FILTERS, autolevels_tables, equalize_tables
+from PIL import Image, ImageOps
+
+test_dir = Path(__file__).absolute().parent
+
+
+@pytest.fixture
+def rain():
+    return io.read_image(test_dir.joinpath("rain.jpg"))
+
+
+def pil_filter(filter_name, image, **kwargs):
+    pil_function = {"equalize": ImageOps.equalize, "autolevels": ImageOps.autocontrast}[filter_name]
+    return np.asarray(pil_function(Image.fromarray(image), **kwargs))
+
+
+@pytest.mark.parametrize("filter_name", TONE_FILTERS)
+@pytest.mark.parametrize("implementation", ["numpy", "numba_parallel"])
+def test_matches_pil(rain, filter_name, implementation):
+    filter_function = get_filter(filter_name, implementation)
+    # rgb, gray, and a low-contrast image
+    for image in (rain, rain[..., 1].copy(), (rain // 3 + 40).astype(np.uint8)):
+        np.testing.assert_array_equal(filter_function(image), pil_filter(filter_name, image))
+
+
+@pytest.mark.parametrize("implementation", ["numpy", "numba_parallel"])
+def test_autolevels_cutoff(rain, implementation):
+    filter_function = get_filter("autolevels", implementation)
+    np.testing.assert_array_equal(filter_function(rain, cutoff=2), pil_filter("autolevels", rain, cutoff=2))
+    with pytest.raises(ValueError):
+        filter_function(rain, cutoff=50)
+
+
+def test_bands(rain):
+    """Counting and remapping one band of rows at a time gives the same result"""
+    from in3110_instapy.numpy_filters import numpy_equalize
+
+    np.testing.assert_array_equal(numpy_equalize(rain, band_rows=7), numpy_equalize(rain))
+
+
+@pytest.mark.parametrize("filter_name", TONE_FILTERS)
+@pytest.mark.parametrize("implementation", ["numpy", "numba_parallel"])
+def test_out(image, filter_name, implementation):
+    filter_function = get_filter(filter_name, implementation)
+    out = np.empty_like(image)
+    assert filter_function(image, out=out) is out
+    np.testing.assert_array_equal(out, filter_function(image))
+    with pytest.raises(ValueError):
+        filter_function(image, out=np.empty((1, 1, 3), dtype=np.uint8))
+
+
+def test_flat_histograms():
+    """Images with a single value are left unchanged"""
+    histograms = np.zeros((2, 256), dtype=np.int64)
+    histograms[:, 100] = 50
+    np.testing.assert_array_equal(equalize_tables(histograms)[0], np.arange(256))
+    np.testing.assert_array_equal(autolevels_tables(histograms)[1], np.arange(256))
+
+
+def test_autolevels_stretch():
+    histograms = np.zeros((1, 256), dtype=np.int64)
+    histograms[0, [50, 100]] = 10
+    table = autolevels_tables(histograms)[0]
+    np.testing.assert_array_equal(table[:51], 0)
+    np.testing.assert_array_equal(table[101:], 255)
+    # like PIL, the stretched values are truncated
+    assert table[100] >= 254 and table[75] == 127
+
+
+def test_cli(tmp_path):
+    out_file = tmp_path.joinpath("out.png")
+    cli.main([str(test_dir.joinpath("rain.jpg")), "--equalize", "-i", "numpy", "-o", str(out_file)])
+    assert io.read_image(out_file).shape == io.read_image(test_dir.joinpath("rain.jpg")).shape
+
+    with pytest.raises(SystemExit):
+        cli.main([str(test_dir.joinpath("rain.jpg")), "--autolevels", "-i", "python", "-o", str(out_file)])
+
+
+def test_cli_missing_backend(monkeypatch, tmp_path):
+    def get_filter(filter, implementation):
+        raise ImportError("not built")
+
+    monkeypatch.setattr("in3110_instapy.get_filter", get_filter)
+    with pytest.raises(SystemExit):
+        cli.main([str(test_dir.joinpath("rain.jpg")), "--equalize", "-i", "numpy", "-o", str(tmp_path.joinpath("out.png"))])